@@ -4,48 +4,45 @@ Local server for serving privacy policy, terms of service, and data deletion inf
 Runs on localhost:8080
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import functools
 import json
-from urllib.parse import urlparse
+import html
+from urllib.parse import unquote_plus
 import logging
-from urllib.parse import parse_qs
+import os
+import re
 from time import time
+from dataclasses import dataclass
+from typing import Optional
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-token_container = {"auth_code": None, "state": None, "timestamp": None}
 
-class PolicyHandler(BaseHTTPRequestHandler):
-    """HTTP请求处理器"""
-    
-    def do_GET(self):
-        """处理GET请求"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        
-        logger.info(f"Received request for: {path}")
-        
-        # 路由处理
-        if path == '/private' or path == '/privacy':
-            self.serve_privacy_policy()
-        elif path == '/rules' or path == '/terms':
-            self.serve_terms_of_service()
-        elif path == '/database' or path == '/data-deletion':
-            self.serve_data_deletion_info()
-        elif path == '/' or path == '/index':
-            self.serve_index()
-        elif path == '/callback':
-            self.serve_oauth_callback()
-        elif path == '/code':
-            self.serve_auth_code()
-        else:
-            self.serve_404()
-    
-    def serve_privacy_policy(self):
-        """返回隐私政策"""
-        html_content = """
+@dataclass(slots=True, frozen=True)
+class TokenState:
+    """OAuth 回调拿到的授权码快照"""
+    auth_code: Optional[str] = None
+    state: Optional[str] = None
+    timestamp: Optional[float] = None
+
+
+# 只通过整体替换引用来更新，读取方总能拿到一致的快照，无需加锁
+token_state = TokenState()
+# /code 响应缓存: (TokenState, 序列化后的 bytes)
+_auth_code_cache = (None, None)
+
+
+def _compact_html(html_text):
+    """去掉源码缩进带来的行首空白，并编码为 UTF-8 bytes"""
+    return re.sub(rb'\n[ \t]+', b'\n', html_text.strip().encode('utf-8'))
+
+
+# 静态页面在导入时预先编码为 UTF-8 bytes，请求处理时直接写出
+_PRIVACY_HTML = _compact_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -137,16 +134,9 @@ class PolicyHandler(BaseHTTPRequestHandler):
             </div>
         </body>
         </html>
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def serve_terms_of_service(self):
-        """返回服务条款"""
-        html_content = """
+        """)
+
+_TERMS_HTML = _compact_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -254,16 +244,9 @@ class PolicyHandler(BaseHTTPRequestHandler):
             </div>
         </body>
         </html>
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def serve_data_deletion_info(self):
-        """返回数据删除说明"""
-        html_content = """
+        """)
+
+_DATA_DELETION_HTML = _compact_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -397,16 +380,9 @@ class PolicyHandler(BaseHTTPRequestHandler):
             </div>
         </body>
         </html>
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def serve_index(self):
-        """返回首页"""
-        html_content = """
+        """)
+
+_INDEX_HTML = _compact_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -541,96 +517,9 @@ class PolicyHandler(BaseHTTPRequestHandler):
             </div>
         </body>
         </html>
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    # serve oauth callback in response['code']
-    def serve_oauth_callback(self):
-        parsed_url = urlparse(self.path)
-        params = parse_qs(parsed_url.query)
-
-        code = params.get('code', [None])[0]
-        state = params.get('state', [None])[0]
-        error = params.get('error', [None])[0]
-
-        self.send_response(200)
-        self.send_header("Content-type", "text/html; charset=utf-8")
-        self.end_headers()
+        """)
 
-        global token_container
-
-        if error:
-            html = f"""
-            <html>
-            <head><title>Authorization Failed</title></head>
-            <body>
-                <h1>Authorization Failed</h1>
-                <p>Error: {error}</p>
-                <p>The authorization was cancelled or failed. You can close this window.</p>
-            </body>
-            </html>
-            """
-            logger.error(f"OAuth authorization failed: {error}")
-        elif code:
-            logger.info(f"Received authorization code: {code[:10]}...")
-
-            token_container.update({
-                "auth_code": code,
-                "state": state,
-                "timestamp": time(),
-            })
-
-            html = """
-            <html>
-            <head><title>Authorization Successful</title></head>
-            <body>
-                <h1>Authorization Successful!</h1>
-                <p>You have successfully authorized the Meta Ads application.</p>
-                <p>You can now close this window and return to your application.</p>
-                <script>
-                    // Try to close the window automatically after 2 seconds
-                    setTimeout(function() {
-                        window.close();
-                    }, 2000);
-                </script>
-            </body>
-            </html>
-            """
-            logger.info("OAuth authorization successful")
-        else:
-            html = """
-            <html>
-            <head><title>Unexpected Response</title></head>
-            <body>
-                <h1>Unexpected Response</h1>
-                <p>No authorization code or error received. Please try again.</p>
-            </body>
-            </html>
-            """
-            logger.warning("OAuth callback received without code or error")
-
-        self.wfile.write(html.encode("utf-8"))
-
-    # ✅ 新增：返回 auth_code，保证在 response['code'] 中
-    def serve_auth_code(self):
-        self.send_response(200)
-        self.send_header("Content-type", "application/json; charset=utf-8")
-        self.end_headers()
-
-        response_data = {
-            "code": token_container.get("auth_code"),
-            "state": token_container.get("state"),
-            "timestamp": token_container.get("timestamp"),
-        }
-        self.wfile.write(json.dumps(response_data).encode("utf-8"))
-    
-    def serve_404(self):
-        """返回404页面"""
-        html_content = """
+_NOT_FOUND_HTML = _compact_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -676,24 +565,229 @@ class PolicyHandler(BaseHTTPRequestHandler):
             </div>
         </body>
         </html>
-        """
+        """)
+
+_OAUTH_ERROR_TEMPLATE = _compact_html("""
+            <html>
+            <head><title>Authorization Failed</title></head>
+            <body>
+                <h1>Authorization Failed</h1>
+                <p>Error: %s</p>
+                <p>The authorization was cancelled or failed. You can close this window.</p>
+            </body>
+            </html>
+            """)
+
+_OAUTH_OK_HTML = _compact_html("""
+            <html>
+            <head><title>Authorization Successful</title></head>
+            <body>
+                <h1>Authorization Successful!</h1>
+                <p>You have successfully authorized the Meta Ads application.</p>
+                <p>You can now close this window and return to your application.</p>
+                <script>
+                    // Try to close the window automatically after 2 seconds
+                    setTimeout(function() {
+                        window.close();
+                    }, 2000);
+                </script>
+            </body>
+            </html>
+            """)
+
+_OAUTH_NO_CODE_HTML = _compact_html("""
+            <html>
+            <head><title>Unexpected Response</title></head>
+            <body>
+                <h1>Unexpected Response</h1>
+                <p>No authorization code or error received. Please try again.</p>
+            </body>
+            </html>
+            """)
+
+
+def _parse_query(query):
+    """解析查询字符串，每个参数只保留第一个值"""
+    params = {}
+    for pair in query.split('&'):
+        key, _, value = pair.partition('=')
+        if key and value:
+            params.setdefault(unquote_plus(key), unquote_plus(value))
+    return params
+
+
+@functools.lru_cache(maxsize=32)
+def _render_oauth_error(error):
+    """渲染 OAuth 错误页面；error 来自查询参数，转义后再回显，避免反射型 XSS"""
+    return _OAUTH_ERROR_TEMPLATE % html.escape(error).encode('utf-8')
+
+
+class PolicyHandler(BaseHTTPRequestHandler):
+    """HTTP请求处理器"""
+    # 对已接受的连接设置 TCP_NODELAY，避免小响应被 Nagle 算法延迟
+    disable_nagle_algorithm = True
+    # 所有响应都带 Content-Length，可以启用 HTTP/1.1 持久连接
+    protocol_version = "HTTP/1.1"
+    # 空闲的持久连接超时后关闭，避免长期占用处理线程
+    timeout = 30
+    
+    def do_GET(self):
+        """处理GET请求"""
+        # 只有 /callback 需要查询参数，这里直接切掉 '?' 之后的部分
+        qidx = self.path.find('?')
+        path = self.path if qidx < 0 else self.path[:qidx]
         
-        self.send_response(404)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+        logger.debug("Received request for: %s", path)
+        
+        # 路由处理：静态页面直接命中预先拼好的响应，其余交给处理方法
+        response = _STATIC_ROUTES.get(path)
+        if response is not None:
+            self._send_prebuilt(response)
+        else:
+            self._ROUTES.get(path, PolicyHandler.serve_404)(self)
+    
+    # serve oauth callback in response['code']
+    def serve_oauth_callback(self):
+        global token_state
+
+        params = _parse_query(self.path.partition('?')[2])
+
+        code = params.get('code')
+        state = params.get('state')
+        error = params.get('error')
+
+        if error:
+            body = _render_oauth_error(error)
+            logger.error("OAuth authorization failed: %s", error)
+        elif code:
+            logger.info("Received authorization code: %s...", code[:10])
+
+            token_state = TokenState(auth_code=code, state=state, timestamp=time())
+
+            body = _OAUTH_OK_HTML
+            logger.info("OAuth authorization successful")
+        else:
+            body = _OAUTH_NO_CODE_HTML
+            logger.warning("OAuth callback received without code or error")
+
+        self._send_html(200, body)
+
+    # ✅ 新增：返回 auth_code，保证在 response['code'] 中
+    def serve_auth_code(self):
+        global _auth_code_cache
+
+        token = token_state
+        cached_token, body = _auth_code_cache
+        # token 未变化时直接复用上次序列化的结果
+        if cached_token is not token:
+            response_data = {
+                "code": token.auth_code,
+                "state": token.state,
+                "timestamp": token.timestamp,
+            }
+            body = json.dumps(response_data).encode("utf-8")
+            _auth_code_cache = (token, body)
+
+        self._send_body(200, "application/json; charset=utf-8", body)
+    
+    def serve_404(self):
+        """返回404页面"""
+        self._send_prebuilt(_NOT_FOUND_RESPONSE)
     
+    def _send_html(self, status, body):
+        """写出预编码的 HTML 页面"""
+        self._send_body(status, 'text/html; charset=utf-8', body)
+
+    def _send_body(self, status, content_type, body):
+        """把响应头和正文合并到同一次写入，避免头部和正文各占一次 send"""
+        self.log_request(status)
+        if self.request_version == 'HTTP/0.9':
+            # HTTP/0.9 的响应没有状态行和响应头
+            self.wfile.write(body)
+            return
+        head = (
+            f"{self.protocol_version} {status} {HTTPStatus(status).phrase}\r\n"
+            f"Server: {self.version_string()}\r\n"
+            f"Date: {self.date_time_string()}\r\n"
+            f"Content-type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        self.wfile.write(head.encode('latin-1') + body)
+
+    def _send_prebuilt(self, response):
+        """一次写出预先拼好的状态行、响应头和正文，Date 头在发送时补上"""
+        status, head, body = response
+        self.log_request(status)
+        if self.request_version == 'HTTP/0.9':
+            # HTTP/0.9 的响应没有状态行和响应头
+            self.wfile.write(body)
+            return
+        self.wfile.write(head + f"Date: {self.date_time_string()}\r\n\r\n".encode('latin-1') + body)
+
     def log_message(self, format, *args):
         """自定义日志格式"""
-        logger.info(f"{self.address_string()} - {format % args}")
+        logger.info("%s - " + format, self.address_string(), *args)
+
+
+def _build_response(status, body, cacheable=False):
+    """预先拼好静态页面的响应 (状态行 + 响应头, 正文)，Date 头由 _send_prebuilt 在发送时追加"""
+    headers = [
+        f"{PolicyHandler.protocol_version} {status} {HTTPStatus(status).phrase}",
+        f"Server: {PolicyHandler.server_version} {PolicyHandler.sys_version}",
+        "Content-type: text/html; charset=utf-8",
+        f"Content-Length: {len(body)}",
+    ]
+    if cacheable:
+        headers.append("Cache-Control: public, max-age=3600")
+    return status, ("\r\n".join(headers) + "\r\n").encode('latin-1'), body
+
+
+_PRIVACY_RESPONSE = _build_response(200, _PRIVACY_HTML, cacheable=True)
+_TERMS_RESPONSE = _build_response(200, _TERMS_HTML, cacheable=True)
+_DATA_DELETION_RESPONSE = _build_response(200, _DATA_DELETION_HTML, cacheable=True)
+_INDEX_RESPONSE = _build_response(200, _INDEX_HTML, cacheable=True)
+_NOT_FOUND_RESPONSE = _build_response(404, _NOT_FOUND_HTML)
+
+
+# 静态路由表：路径 -> 预先拼好的响应
+_STATIC_ROUTES = {
+    '/private': _PRIVACY_RESPONSE,
+    '/privacy': _PRIVACY_RESPONSE,
+    '/rules': _TERMS_RESPONSE,
+    '/terms': _TERMS_RESPONSE,
+    '/database': _DATA_DELETION_RESPONSE,
+    '/data-deletion': _DATA_DELETION_RESPONSE,
+    '/': _INDEX_RESPONSE,
+    '/index': _INDEX_RESPONSE,
+}
+
+# 动态路由表：路径 -> 处理方法
+PolicyHandler._ROUTES = {
+    '/callback': PolicyHandler.serve_oauth_callback,
+    '/code': PolicyHandler.serve_auth_code,
+}
+
+
+# 生产环境设置 POLICY_SERVER_QUIET=1 关闭逐请求的访问日志
+if os.environ.get('POLICY_SERVER_QUIET'):
+    PolicyHandler.log_message = lambda self, format, *args: None
+
+
+class PolicyServer(ThreadingHTTPServer):
+    """多线程 HTTP 服务器"""
+    daemon_threads = True
+    # 重启时允许立即复用处于 TIME_WAIT 的端口
+    allow_reuse_address = True
+    # 默认 listen backlog 只有 5，突发连接时会被内核直接拒绝
+    request_queue_size = 128
 
 
 def run_server(host='localhost', port=8080):
     """启动服务器"""
     server_address = (host, port)
-    httpd = HTTPServer(server_address, PolicyHandler)
+    httpd = PolicyServer(server_address, PolicyHandler)
     
-    logger.info(f"🚀 Starting server on http://{host}:{port}")
+    logger.info("🚀 Starting server on http://%s:%s", host, port)
     logger.info("📋 Available endpoints:")
     logger.info("   • http://localhost:8080/ - 首页")
     logger.info("   • http://localhost:8080/private - 隐私政策")
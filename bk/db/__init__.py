@@ -1,4 +1,4 @@
-from ithaca.db.ithacadb import IthacaDB
-from ithaca.db.history import HistoryModel
+from .ithacadb import IthacaDB
+from .history import HistoryModel
 
-__all__ = ["IthacaDB", "HistoryModel"]
\ No newline at end of file
+__all__ = ["IthacaDB", "HistoryModel"]
@@ -3,16 +3,21 @@ Database model for history marketing plans.
 It matches with the HistoryMarketingPlan in agent_types.py.
 """
 from sqlmodel import SQLModel, Field, Column, String, Float, DateTime
+from sqlalchemy import Index
 from datetime import datetime
 
 
 # History model
 class HistoryModel(SQLModel, table=True):
     __tablename__ = "history"
+    # top-N by score in a recent window
+    __table_args__ = (
+        Index("ix_history_score_created", "plan_score", "created_at"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
 
-    product_name: str | None = Field(default=None, sa_column=Column(String))
+    product_name: str | None = Field(default=None, sa_column=Column(String, index=True))
     product_url: str | None = Field(default=None, sa_column=Column(String))
 
     plan_uuid: str | None = Field(default=None, sa_column=Column(String))
@@ -23,7 +28,16 @@ class HistoryModel(SQLModel, table=True):
     actual_cost: float | None = Field(default=None, sa_column=Column(Float))
 
     plan_evaluation: str | None = Field(default=None, sa_column=Column(String))
-    plan_score: float | None = Field(default=None, sa_column=Column(Float))
+    plan_score: float | None = Field(default=None, sa_column=Column(Float, index=True))
 
-    created_at: datetime | None = Field(default=None, sa_column=Column(DateTime))
+    created_at: datetime | None = Field(default=None, sa_column=Column(DateTime, index=True))
     evaluated_at: datetime | None = Field(default=None, sa_column=Column(DateTime))
+
+
+# create_all only creates indexes along with new tables, these bring existing databases up to date
+HISTORY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_history_product_name ON history (product_name)",
+    "CREATE INDEX IF NOT EXISTS ix_history_plan_score ON history (plan_score)",
+    "CREATE INDEX IF NOT EXISTS ix_history_created_at ON history (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_history_score_created ON history (plan_score, created_at)",
+)
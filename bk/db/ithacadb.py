@@ -1,8 +1,11 @@
-from typing import List, Optional, Callable, Any, Type, Dict, Union
+from typing import List, Optional, Callable, Any, Type, Dict, Union, Iterator
 import functools
+import operator
+import threading
+import time
 from sqlmodel import SQLModel, select, create_engine, text, Session
 from sqlalchemy.engine import Engine
-from sqlalchemy import desc, asc, and_, or_
+from sqlalchemy import desc, asc, and_, or_, event, insert, inspect
 from datetime import datetime, timedelta
 
 from ithaca.settings import DB_PATH
@@ -10,6 +13,44 @@ from ithaca.utils import get_cache_dir
 from ithaca.logger import logger
 
 
+# SQLite has a single writer, a few connections are enough; WAL lets readers run alongside it
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",   # 256 MB
+    "PRAGMA cache_size=-64000",     # 64 MB
+)
+
+
+# advanced_query filter operators, unknown operators fall back to "=="
+_FILTER_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "!=": operator.ne,
+    "==": operator.eq,
+    "like": lambda field, value: field.like(value),
+    "in": lambda field, value: field.in_(value),
+    "not_in": lambda field, value: ~field.in_(value),
+}
+
+# advanced_query time filters, keyed on the suffix of "<field>_<suffix>"
+_TIME_FILTER_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "after": lambda field, value: field >= value,
+    "before": lambda field, value: field <= value,
+    "within": lambda field, value: field >= datetime.now() - value,
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
 class IthacaDB:
     """
     IthacaDB class, provide a unified interface to the database.
@@ -19,50 +60,61 @@ class IthacaDB:
     """
     _db_engine: Engine = None
     _db_available: bool = False
-    _check_time: datetime = None
-    _check_interval: int = 60   # 60 s
+    _check_deadline: float = 0.0    # time.monotonic() until which the last check is trusted
+    _check_interval: float = 60.0   # 60 s
+    # writes are serialized in process, instead of failing with "database is locked"
+    _write_lock = threading.Lock()
+    _engine_lock = threading.Lock()
 
     @classmethod
     def get_db_engine(cls) -> Engine:
         if cls._db_engine is None:
-            db_path = DB_PATH or get_cache_dir() / "ithaca.db"
-            cls._db_engine = create_engine(
-                url=f"sqlite:///{db_path}",
-                pool_size=300,
-                max_overflow=500,
-                pool_timeout=30,
-                pool_pre_ping=True,
-            )
-            # init the database
-            # before init, import all the models
-            import ithaca.db.history
-            try:
-                SQLModel.metadata.create_all(cls._db_engine)
-            except Exception as e:
-                logger.error(f"Failed to initialize database: {e}")
-            cls._db_available = True
-            cls._check_time = datetime.now()
-            logger.info(f"Database initialized successfully at {db_path}")
+            with cls._engine_lock:
+                if cls._db_engine is None:
+                    db_path = DB_PATH or get_cache_dir() / "ithaca.db"
+                    engine = create_engine(
+                        url=f"sqlite:///{db_path}",
+                        pool_size=5,
+                        max_overflow=10,
+                        pool_timeout=30,
+                        pool_pre_ping=True,
+                        connect_args={"check_same_thread": False, "timeout": 30},
+                    )
+                    event.listen(engine, "connect", _set_sqlite_pragmas)
+                    # init the database
+                    # before init, import all the models
+                    from . import history
+                    try:
+                        SQLModel.metadata.create_all(engine)
+                        with engine.begin() as conn:
+                            for statement in history.HISTORY_INDEXES:
+                                conn.execute(text(statement))
+                    except Exception as e:
+                        logger.error(f"Failed to initialize database: {e}")
+                    # publish only once the tables exist
+                    cls._db_engine = engine
+                    cls._db_available = True
+                    cls._check_deadline = time.monotonic() + cls._check_interval
+                    logger.info(f"Database initialized successfully at {db_path}")
         return cls._db_engine
 
     @classmethod
     def check_db_available(cls, force: bool = False) -> bool:
-        if not force and cls._db_available and cls._check_time is not None:
-            if datetime.now() - cls._check_time < timedelta(seconds=cls._check_interval):
-                logger.debug(f"Database is available, last checked at {cls._check_time}")
-                return True
+        # hot path, runs before every db operation
+        if not force and cls._db_available and time.monotonic() < cls._check_deadline:
+            return True
         
         try:
             engine = cls.get_db_engine()
             with engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             cls._db_available = True
-            cls._check_time = datetime.now()
-            logger.info(f"Database is available, refreshed at {cls._check_time}")
+            cls._check_deadline = time.monotonic() + cls._check_interval
+            logger.info("Database is available, next check in %ss", cls._check_interval)
             return True
         except Exception as e:
             cls._db_available = False
-            cls._check_time = datetime.now()
+            cls._check_deadline = 0.0
             logger.error(f"Database is not available: {e}")
             return False
     
@@ -95,21 +147,78 @@ class IthacaDB:
             logger.error("No data to add")
             return False
         
-        with IthacaDB.create_session() as session:
-            session.add_all(data)
+        model = type(data[0])
+        with IthacaDB._write_lock, IthacaDB.create_session() as session:
+            if len(data) > 1 and all(type(item) is model for item in data):
+                # one executemany instead of a unit-of-work flush per row,
+                # unset primary keys are left to the database and the generated ones are written back
+                pk_names = [column.key for column in inspect(model).primary_key]
+                rows = [
+                    {
+                        key: value for key, value in item.model_dump().items()
+                        if not (key in pk_names and value is None)
+                    }
+                    for item in data
+                ]
+                statement = insert(model).returning(
+                    *(getattr(model, name) for name in pk_names), sort_by_parameter_order=True
+                )
+                for item, pk in zip(data, session.execute(statement, rows)):
+                    for name, value in zip(pk_names, pk):
+                        setattr(item, name, value)
+            else:
+                session.add_all(data)
             session.commit()
         logger.info(f"Added {len(data)} data to the database")
         return True
     
+    @staticmethod
+    def _equal_conditions(model: Type[SQLModel], filters: Optional[Dict[str, Any]]) -> List[Any]:
+        return [getattr(model, key) == value for key, value in (filters or {}).items()]
+
     @staticmethod
     @db_available_wrapper
     def query(model: Type[SQLModel], filters: Dict[str, Any]) -> List[SQLModel]:
         with IthacaDB.create_session() as session:
-            statement = select(model)
-            if filters:
-                for key, value in filters.items():
-                    statement = statement.where(getattr(model, key) == value)
+            statement = select(model).where(*IthacaDB._equal_conditions(model, filters))
             return session.exec(statement).all()
+
+    @staticmethod
+    @db_available_wrapper
+    def first(model: Type[SQLModel], filters: Optional[Dict[str, Any]] = None) -> Optional[SQLModel]:
+        """
+        Returns the first row matching the equal `filters`, or None. Only one row is fetched.
+        """
+        with IthacaDB.create_session() as session:
+            statement = select(model).where(*IthacaDB._equal_conditions(model, filters)).limit(1)
+            return session.exec(statement).first()
+
+    @staticmethod
+    @db_available_wrapper
+    def exists(model: Type[SQLModel], filters: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Whether any row matches the equal `filters`, without loading the rows.
+        """
+        with IthacaDB.create_session() as session:
+            statement = select(select(model).where(*IthacaDB._equal_conditions(model, filters)).exists())
+            return bool(session.scalar(statement))
+
+    @staticmethod
+    @db_available_wrapper
+    def stream(
+        model: Type[SQLModel],
+        filters: Optional[Dict[str, Any]] = None,
+        chunk: int = 1000,
+    ) -> Iterator[SQLModel]:
+        """
+        Yields the rows matching the equal `filters`, fetched `chunk` rows at a time,
+        for jobs walking large tables. The session stays open until the iteration ends.
+        """
+        statement = select(model).where(*IthacaDB._equal_conditions(model, filters))
+        def rows() -> Iterator[SQLModel]:
+            with IthacaDB.create_session() as session:
+                yield from session.exec(statement.execution_options(yield_per=chunk))
+        return rows()
     
     @staticmethod
     @db_available_wrapper
@@ -121,7 +230,8 @@ class IthacaDB:
         order_desc: bool = True,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-        logical_operator: str = "and"
+        logical_operator: str = "and",
+        columns: Optional[List[str]] = None,
     ) -> List[SQLModel]:
         """
         Advanced query function, support complex SQL query conditions.
@@ -138,9 +248,10 @@ class IthacaDB:
             limit: Limit the number of returned records
             offset: Skip the number of records
             logical_operator: Logical relationship between multiple conditions ("and" or "or")
+            columns: Only select these fields (projection). Rows are returned instead of model instances
         
         Returns:
-            List[SQLModel]: Query result list
+            List[SQLModel]: Query result list, or a list of rows if columns is given
             
         Examples:
             # Query the last 5 records
@@ -179,9 +290,21 @@ class IthacaDB:
                 order_by="plan_score",
                 order_desc=True
             )
+            
+            # Only fetch the fields needed for a prompt
+            IthacaDB.advanced_query(
+                HistoryModel,
+                filters={"product_name": "iPhone"},
+                order_by="created_at",
+                limit=5,
+                columns=["plan_uuid", "plan_description", "plan_score"]
+            )
         """
         with IthacaDB.create_session() as session:
-            statement = select(model)
+            if columns:
+                statement = select(*(getattr(model, column) for column in columns))
+            else:
+                statement = select(model)
             conditions = []
             
             # Handle basic filters
@@ -191,25 +314,8 @@ class IthacaDB:
                     
                     if isinstance(value, dict):
                         # Support operators: {">=": 8.0}, {"<": 100}, {"!=": "test"}, {"like": "%pattern%"}
-                        for operator, op_value in value.items():
-                            if operator == ">=":
-                                conditions.append(field >= op_value)
-                            elif operator == "<=":
-                                conditions.append(field <= op_value)
-                            elif operator == ">":
-                                conditions.append(field > op_value)
-                            elif operator == "<":
-                                conditions.append(field < op_value)
-                            elif operator == "!=":
-                                conditions.append(field != op_value)
-                            elif operator == "like":
-                                conditions.append(field.like(op_value))
-                            elif operator == "in":
-                                conditions.append(field.in_(op_value))
-                            elif operator == "not_in":
-                                conditions.append(~field.in_(op_value))
-                            else:
-                                conditions.append(field == op_value)
+                        for op, op_value in value.items():
+                            conditions.append(_FILTER_OPS.get(op, operator.eq)(field, op_value))
                     else:
                         # Simple equal value query
                         conditions.append(field == value)
@@ -217,19 +323,10 @@ class IthacaDB:
             # Handle time filters
             if time_filters:
                 for time_key, time_value in time_filters.items():
-                    if time_key.endswith("_after"):
-                        field_name = time_key.replace("_after", "")
-                        field = getattr(model, field_name)
-                        conditions.append(field >= time_value)
-                    elif time_key.endswith("_before"):
-                        field_name = time_key.replace("_before", "")
-                        field = getattr(model, field_name)
-                        conditions.append(field <= time_value)
-                    elif time_key.endswith("_within"):
-                        field_name = time_key.replace("_within", "")
-                        field = getattr(model, field_name)
-                        cutoff_time = datetime.now() - time_value
-                        conditions.append(field >= cutoff_time)
+                    field_name, _, suffix = time_key.rpartition("_")
+                    time_op = _TIME_FILTER_OPS.get(suffix)
+                    if time_op is not None:
+                        conditions.append(time_op(getattr(model, field_name), time_value))
             
             # Apply conditions
             if conditions:
@@ -256,24 +353,30 @@ class IthacaDB:
     
     @staticmethod
     @db_available_wrapper
-    def update(data: SQLModel | List[SQLModel]) -> bool:
+    def update(data: SQLModel | List[SQLModel], refresh: bool = True) -> bool:
+        """
+        Commits the changes of the given objects and reloads them from the database.
+        With `refresh=False` the reload (one SELECT per object) is skipped, the objects keep their in-memory values.
+        """
         if isinstance(data, SQLModel):
             data = [data]
         elif not data:
             logger.error("No data to update")
             return False
         
-        with IthacaDB.create_session() as session:
+        # without a refresh, keep the committed values loaded instead of expiring them
+        with IthacaDB._write_lock, Session(IthacaDB.get_db_engine(), expire_on_commit=refresh) as session:
             session.add_all(data)
             session.commit()
-            for item in data:
-                session.refresh(item)
+            if refresh:
+                for item in data:
+                    session.refresh(item)
         return True
     
     @staticmethod
     @db_available_wrapper
     def delete(data: SQLModel) -> bool:
-        with IthacaDB.create_session() as session:
+        with IthacaDB._write_lock, IthacaDB.create_session() as session:
             session.delete(data)
             session.commit()
         return True
\ No newline at end of file
@@ -9,6 +9,7 @@ import os
 import json
 import threading
 import socket
+import struct
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from pathlib import Path
@@ -19,6 +20,38 @@ from ithaca.workflow.base import BaseWorkFlow
 from ithaca.logger import logger
 
 
+# 控制命令的消息格式: 4 字节大端长度 + UTF-8 正文
+_HDR = struct.Struct("!I")
+# 连接的内核发送缓冲区大小，足够一次写出完整的状态 JSON
+_SOCK_BUF_SIZE = 65536
+# 同时处理的控制连接上限，超出的连接直接关闭
+_MAX_CONNECTIONS = 4
+# 连接上等待命令时的超时，到期后检查调度器是否仍在运行
+_CONN_POLL_TIMEOUT = 1.0
+# 连接空闲超过该时间即关闭，释放连接名额
+_CONN_IDLE_TIMEOUT = 60.0
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    """读满 n 字节；对端在消息开始前关闭连接时返回 b''"""
+    chunks = []
+    received = 0
+    while received < n:
+        try:
+            chunk = conn.recv(n - received)
+        except socket.timeout:
+            if received:
+                raise ConnectionError("Connection stalled in the middle of a message")
+            raise
+        if not chunk:
+            if received:
+                raise ConnectionError("Connection closed in the middle of a message")
+            return b""
+        chunks.append(chunk)
+        received += len(chunk)
+    return b"".join(chunks)
+
+
 class SimpleScheduler:
     """
     简单调度器 - 支持后台运行和命令行控制
@@ -48,6 +81,7 @@ class SimpleScheduler:
         self.status_file = Path(f"/tmp/ithaca_scheduler_{name}_status.json")
         self.command_socket_path = f"/tmp/ithaca_scheduler_{name}.sock"
         self.command_server = None
+        self._connection_slots = threading.BoundedSemaphore(_MAX_CONNECTIONS)
         
         # 信号处理
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -236,12 +270,17 @@ class SimpleScheduler:
                     try:
                         server.settimeout(1.0)
                         conn, addr = server.accept()
+                        if not self._connection_slots.acquire(blocking=False):
+                            logger.warning("Too many command connections, rejecting a new one")
+                            conn.close()
+                            continue
+                        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCK_BUF_SIZE)
+                        conn.settimeout(_CONN_POLL_TIMEOUT)
                         
-                        data = conn.recv(1024).decode('utf-8').strip()
-                        response = self._handle_command(data)
-                        
-                        conn.send(response.encode('utf-8'))
-                        conn.close()
+                        # 每个连接单独处理，客户端可以在同一连接上发送多条命令
+                        threading.Thread(
+                            target=self._serve_connection, args=(conn,), daemon=True
+                        ).start()
                         
                     except socket.timeout:
                         continue
@@ -253,6 +292,33 @@ class SimpleScheduler:
         
         threading.Thread(target=server_thread, daemon=True).start()
     
+    def _serve_connection(self, conn: socket.socket):
+        """处理单个客户端连接上的命令，直到客户端关闭连接"""
+        try:
+            with conn:
+                idle = 0.0
+                while self.running:
+                    try:
+                        header = _recv_exact(conn, _HDR.size)
+                    except socket.timeout:
+                        # 没有新命令，调度器停止或空闲过久时关闭连接
+                        idle += _CONN_POLL_TIMEOUT
+                        if idle >= _CONN_IDLE_TIMEOUT:
+                            break
+                        continue
+                    if not header:
+                        break
+                    
+                    idle = 0.0
+                    (length,) = _HDR.unpack(header)
+                    data = _recv_exact(conn, length)
+                    response = self._handle_command(data.decode('utf-8').strip()).encode('utf-8')
+                    conn.sendall(_HDR.pack(len(response)) + response)
+        except Exception as e:
+            logger.error(f"Command connection error: {e}")
+        finally:
+            self._connection_slots.release()
+    
     def _handle_command(self, command: str) -> str:
         """处理控制命令"""
         try:
@@ -2,48 +2,158 @@
 """
 调度器命令行控制工具
 """
-import argparse
+import functools
 import json
 import socket
+import struct
 import sys
 import os
 import signal
 from pathlib import Path
+from typing import Dict
+
+# 消息格式: 4 字节大端长度 + UTF-8 正文
+_HDR = struct.Struct("!I")
+# 接收缓冲区，只在回复超过当前大小时扩容
+_recv_buf = bytearray(65536)
+# socket 内核缓冲区大小，足够一次收发完整的状态 JSON
+_SOCK_BUF_SIZE = 65536
+
+# 已连接的客户端 socket，按调度器名称缓存，同一进程内多次发送命令时复用
+_clients: Dict[str, socket.socket] = {}
+
+def _get_client(scheduler_name: str) -> socket.socket:
+    """获取（或建立）到调度器的连接"""
+    client = _clients.get(scheduler_name)
+    if client is None:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCK_BUF_SIZE)
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCK_BUF_SIZE)
+        try:
+            client.connect(f"/tmp/ithaca_scheduler_{scheduler_name}.sock")
+        except OSError:
+            client.close()
+            raise
+        _clients[scheduler_name] = client
+    return client
+
+def _close_client(scheduler_name: str):
+    """关闭并移除缓存的连接"""
+    client = _clients.pop(scheduler_name, None)
+    if client is not None:
+        client.close()
+
+def _recv_exact(sock: socket.socket, n: int) -> memoryview:
+    """从 socket 读满 n 字节到接收缓冲区"""
+    view = memoryview(_recv_buf)[:n]
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:], n - received)
+        if count == 0:
+            raise ConnectionError("Scheduler closed the connection")
+        received += count
+    return view
+
+def _recv_message(sock: socket.socket) -> str:
+    """读取一条带长度前缀的消息"""
+    global _recv_buf
+    (length,) = _HDR.unpack(_recv_exact(sock, _HDR.size))
+    if length > len(_recv_buf):
+        _recv_buf = bytearray(length)
+    return str(_recv_exact(sock, length), 'utf-8')
 
 def send_command(scheduler_name: str, command: str) -> str:
     """向调度器发送命令"""
-    socket_path = f"/tmp/ithaca_scheduler_{scheduler_name}.sock"
-    
-    if not os.path.exists(socket_path):
-        return f"Scheduler '{scheduler_name}' is not running"
-    
+    payload = command.encode('utf-8')
     try:
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client.connect(socket_path)
-        client.send(command.encode('utf-8'))
-        
-        response = client.recv(4096).decode('utf-8')
-        client.close()
-        
-        return response
+        # 缓存的连接可能已被调度器关闭，失败时重连一次
+        for attempt in range(2):
+            try:
+                client = _get_client(scheduler_name)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # socket 文件不存在或无人监听，直接由 connect 判断，省去一次 stat
+                return f"Scheduler '{scheduler_name}' is not running"
+            try:
+                client.sendall(_HDR.pack(len(payload)) + payload)
+            except (BrokenPipeError, ConnectionError):
+                # 只有发送失败才说明命令没有送达，可以安全重发；发送成功后的错误不重试，避免命令执行两次
+                _close_client(scheduler_name)
+                if attempt:
+                    raise
+                continue
+            return _recv_message(client)
         
     except Exception as e:
+        _close_client(scheduler_name)
         return f"Error communicating with scheduler: {e}"
 
 def get_scheduler_status(scheduler_name: str) -> dict:
     """获取调度器状态"""
     status_file = Path(f"/tmp/ithaca_scheduler_{scheduler_name}_status.json")
     
-    if not status_file.exists():
+    try:
+        # 一次读出全部字节，json.loads 直接解析 bytes，省去文本解码流
+        return json.loads(status_file.read_bytes())
+    except FileNotFoundError:
         return {"error": f"Scheduler '{scheduler_name}' status not found"}
+    except Exception as e:
+        return {"error": f"Failed to read status: {e}"}
+
+def _print_status(scheduler_name: str) -> int:
+    status = get_scheduler_status(scheduler_name)
+    if "error" in status:
+        print(status["error"])
+        return 1
     
+    print(f"Scheduler '{scheduler_name}' Status:")
+    print(f"  Running: {status.get('running', False)}")
+    print(f"  Paused: {status.get('paused', False)}")
+    print(f"  Steps completed: {status.get('step_count', 0)}")
+    print(f"  Uptime: {status.get('uptime_seconds', 0):.0f} seconds")
+    print(f"  Last run: {status.get('last_run_time', 'Never')}")
+    print(f"  Next run: {status.get('next_run_time', 'Unknown')}")
+    print(f"  Interval: {status.get('interval_seconds', 0)} seconds")
+    print(f"  PID: {status.get('pid', 'Unknown')}")
+    return 0
+
+def _kill_scheduler(scheduler_name: str) -> int:
+    pid_file = Path(f"/tmp/ithaca_scheduler_{scheduler_name}.pid")
     try:
-        with open(status_file, 'r') as f:
-            return json.load(f)
+        pid = int(pid_file.read_text().strip())
+        os.kill(pid, signal.SIGTERM)
+        print(f"Sent SIGTERM to scheduler PID {pid}")
+    except FileNotFoundError:
+        print(f"Scheduler '{scheduler_name}' PID file not found")
+        return 1
+    except ProcessLookupError:
+        print(f"Scheduler '{scheduler_name}' is not running (stale PID file)")
+        return 1
     except Exception as e:
-        return {"error": f"Failed to read status: {e}"}
+        print(f"Failed to kill scheduler: {e}")
+        return 1
+    return 0
+
+def _send_and_print(scheduler_name: str, command: str) -> int:
+    print(send_command(scheduler_name, command))
+    return 0
+
+# 不带参数的常用命令，跳过 argparse 直接分发
+_FAST_COMMANDS = {
+    "status": _print_status,
+    "kill": _kill_scheduler,
+    "stop": functools.partial(_send_and_print, command="stop"),
+    "pause": functools.partial(_send_and_print, command="pause"),
+    "resume": functools.partial(_send_and_print, command="resume"),
+}
 
 def main():
+    argv = sys.argv[1:]
+    if len(argv) == 1 and argv[0] in _FAST_COMMANDS:
+        return _FAST_COMMANDS[argv[0]]("scheduler")
+    
+    # 只有带参数的命令才需要构建完整的解析器
+    import argparse
+    
     parser = argparse.ArgumentParser(description="Scheduler Control CLI")
     parser.add_argument("--name", "-n", default="scheduler", help="Scheduler name")
     
@@ -76,48 +186,10 @@ def main():
     
     scheduler_name = args.name
     
-    if args.command == "status":
-        status = get_scheduler_status(scheduler_name)
-        if "error" in status:
-            print(status["error"])
-            return 1
-        
-        print(f"Scheduler '{scheduler_name}' Status:")
-        print(f"  Running: {status.get('running', False)}")
-        print(f"  Paused: {status.get('paused', False)}")
-        print(f"  Steps completed: {status.get('step_count', 0)}")
-        print(f"  Uptime: {status.get('uptime_seconds', 0):.0f} seconds")
-        print(f"  Last run: {status.get('last_run_time', 'Never')}")
-        print(f"  Next run: {status.get('next_run_time', 'Unknown')}")
-        print(f"  Interval: {status.get('interval_seconds', 0)} seconds")
-        print(f"  PID: {status.get('pid', 'Unknown')}")
-        
-    elif args.command == "kill":
-        pid_file = Path(f"/tmp/ithaca_scheduler_{scheduler_name}.pid")
-        if pid_file.exists():
-            try:
-                with open(pid_file, 'r') as f:
-                    pid = int(f.read().strip())
-                os.kill(pid, signal.SIGTERM)
-                print(f"Sent SIGTERM to scheduler PID {pid}")
-            except Exception as e:
-                print(f"Failed to kill scheduler: {e}")
-                return 1
-        else:
-            print(f"Scheduler '{scheduler_name}' PID file not found")
-            return 1
-    
-    elif args.command == "interval":
-        command = f"interval {args.seconds}"
-        response = send_command(scheduler_name, command)
-        print(response)
-    
-    else:
-        # 其他命令直接发送
-        response = send_command(scheduler_name, args.command)
-        print(response)
+    if args.command == "interval":
+        return _send_and_print(scheduler_name, f"interval {args.seconds}")
     
-    return 0
+    return _FAST_COMMANDS[args.command](scheduler_name)
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
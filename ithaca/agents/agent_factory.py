@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 
 from .base import BaseAgent
@@ -24,6 +24,9 @@ class AgentFactory:
         "summary": {}
     }
 
+    # parsed agent config, loaded once per process
+    _config_cache: Optional[Dict[str, Any]] = None
+
     @classmethod
     def build_agent(cls, name: str, config: Dict[str, Any]) -> BaseAgent:
         try:
@@ -32,13 +35,19 @@ class AgentFactory:
         except Exception as e:
             raise e
     
+    @classmethod
+    def load_config(cls) -> Dict[str, Any]:
+        if cls._config_cache is None:
+            if AGENT_CONFIG_FILE and str(AGENT_CONFIG_FILE).endswith(".json"):
+                with open(AGENT_CONFIG_FILE, "r") as f:
+                    cls._config_cache = json.load(f)
+            else:
+                cls._config_cache = cls._default_config
+        return cls._config_cache
+    
     @classmethod
     def build_all(cls) -> Dict[str, BaseAgent]:
-        if AGENT_CONFIG_FILE and AGENT_CONFIG_FILE.endwith(".json"):
-            with open(AGENT_CONFIG_FILE, "r") as f:
-                config_dict = json.loads(f)
-        else:
-            config_dict = cls._default_config
+        config_dict = cls.load_config()
         
         agents = {}
         for name, config in config_dict.items():
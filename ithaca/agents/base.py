@@ -2,14 +2,29 @@
 Warp Gemini LLM to agent.
 
 """
-from typing import List, Callable, Optional, Dict, Any, Union
+from typing import List, Callable, Optional, Dict, Any, Union, Type, TypeVar
 import time
 import json
+import hashlib
+import random
 from datetime import datetime
+from pathlib import Path
+from pydantic import BaseModel
 
 from ithaca.llms import gemini_llm
 from ithaca.logger import logger
 from ithaca.utils import get_cache_dir
+from ithaca.settings import VALIDATE_AGENT_OUTPUT, CACHE_AGENT_RESPONSES
+
+
+# Retry backoff: 0.25s, 0.5s, 1s, ... capped at 8s, plus up to 0.25s of jitter
+_RETRY_BASE_DELAY = 0.25
+_RETRY_MAX_DELAY = 8
+_RETRY_JITTER = 0.25
+# Only the latest error is fed back to the model, trimmed to this many chars
+_RETRY_ERROR_MAX_CHARS = 1000
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
 class BaseAgent:
@@ -70,11 +85,28 @@ class BaseAgent:
         if "max_retry" in kwargs:
             retry_count = kwargs["max_retry"]
             kwargs.pop("max_retry")
-    
+        # calls whose tools have side effects pass `retry_if`, a failed call is only sent again while it returns True
+        retry_if = kwargs.pop("retry_if", None)
+
+        cache_file = None
+        if CACHE_AGENT_RESPONSES:
+            if any(callable(tool) for tool in tools or []):
+                # calls with custom tools have side effects (they create ads objects), never cache those
+                logger.debug("[%s] Response cache skipped, the call has custom tools", self.name)
+            else:
+                cache_file = self._response_cache_file(
+                    prompt, schema, system_prompt, tools, temperature, max_tokens, kwargs
+                )
+                if cache_file.exists():
+                    logger.debug("[%s] Response cache hit: %s", self.name, cache_file.name)
+                    return json.loads(cache_file.read_bytes())["response"]
+
+        base_prompt = prompt
+        attempt = 0
         while True:
             try:
                 if schema:
-                    return gemini_llm.generate_json(
+                    response = gemini_llm.generate_json(
                         prompt=prompt,
                         schema=schema,
                         model=self.model,
@@ -85,7 +117,7 @@ class BaseAgent:
                         **kwargs
                     )
                 else:
-                    return gemini_llm.generate(
+                    response = gemini_llm.generate(
                         model=self.model,
                         prompt=prompt,
                         system_prompt=system_prompt,
@@ -94,16 +126,91 @@ class BaseAgent:
                         max_tokens=max_tokens,
                         **kwargs
                     )
+                break
             except Exception as e:
-                time.sleep(1)
-                if retry_count > 0:
+                if retry_count > 0 and (retry_if is None or retry_if()):
                     logger.warning(f"Error generating response from {self.model}: {e}. Retrying... ({retry_count} retries left)")
                     retry_count -= 1
-                    prompt = prompt + "\n\n" + "Error: " + str(e) + ". Please try again."
+                    time.sleep(
+                        min(_RETRY_BASE_DELAY * 2 ** attempt, _RETRY_MAX_DELAY)
+                        + random.uniform(0, _RETRY_JITTER)
+                    )
+                    attempt += 1
+                    # replace, not accumulate, the error from the previous attempt
+                    error = str(e)[:_RETRY_ERROR_MAX_CHARS]
+                    prompt = base_prompt + "\n\n" + "Error: " + error + ". Please try again."
                     continue
                 else:
                     raise Exception(f"Failed to generate response from {self.model} after {self.max_retry} retries")
 
+        # outside the retry loop, a cache write error must not re-send the paid request
+        if cache_file is not None:
+            try:
+                cache_file.write_bytes(
+                    json.dumps({"response": response}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                )
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning("[%s] Failed to write response cache %s: %s", self.name, cache_file, e)
+        return response
+
+    def _response_cache_file(
+        self,
+        prompt: str,
+        schema: Optional[Dict[str, Any]],
+        system_prompt: Optional[str],
+        tools: Optional[List[Any]],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        options: Dict[str, Any],
+    ) -> Path:
+        """
+        Cache file for a generation, keyed on the sha256 of everything sent to the model,
+        including the extra generation options passed through `_generate_once(**kwargs)`.
+        """
+        key = json.dumps(
+            {
+                "model": self.model,
+                "prompt": prompt,
+                "schema": schema,
+                "system_prompt": system_prompt,
+                "tools": [getattr(tool, "__name__", tool) for tool in tools or []],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "options": options,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        cache_dir = get_cache_dir() / "llm_responses"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    # Schema output loader
+    def _load_output(
+        self,
+        model: Type[ModelT],
+        data: Dict[str, Any],
+        **nested: Type[BaseModel],
+    ) -> ModelT:
+        """
+        Builds `model` from the json returned by a `schema=` generation.
+        Gemini already constrains the response to the schema, so the data is
+        not validated a second time unless settings.VALIDATE_AGENT_OUTPUT is set.
+        `nested` maps fields holding models (or lists of them) to their model,
+        e.g. `adsets=MetaAdsAdSet`, since model_construct does not recurse.
+        """
+        if VALIDATE_AGENT_OUTPUT:
+            return model.model_validate(data)
+
+        for field, field_model in nested.items():
+            value = data.get(field)
+            if isinstance(value, list):
+                data[field] = [field_model.model_construct(**item) for item in value]
+            elif isinstance(value, dict):
+                data[field] = field_model.model_construct(**value)
+        return model.model_construct(**data)
+
     # Default context dumper
     def _dumps_context(self, context: Dict[str, Any]) -> str:
         """
@@ -119,33 +226,36 @@ class BaseAgent:
               - 1234567890
               - 1234567890
         """
-        context_str = "Context:\n"
+        parts = ["Context:\n"]
         
         for key, value in context.items():
             if isinstance(value, dict):
-                context_str += f"\n{key.upper()}:\n"
+                parts.append(f"\n{key.upper()}:\n")
                 for k, v in value.items():
-                    context_str += f"  {k}: {v}\n"
+                    parts.append(f"  {k}: {v}\n")
             elif isinstance(value, list):
-                context_str += f"\n{key.upper()}:\n"
+                parts.append(f"\n{key.upper()}:\n")
                 for item in value:
                     if isinstance(item, dict):
                         for k, v in item.items():
-                            context_str += f"  {k}: {v}\n"
-                        context_str += "\n"
+                            parts.append(f"  {k}: {v}\n")
+                        parts.append("\n")
                     else:
-                        context_str += f"  - {item}\n"
+                        parts.append(f"  - {item}\n")
             else:
-                context_str += f"\n{key.upper()}: {value}\n"
+                parts.append(f"\n{key.upper()}: {value}\n")
         
-        return context_str 
+        return "".join(parts)
 
     def _cache_context(self, context: Dict[str, Any]) -> str:
         """
         Caches the context to the cache directory in json format.
+        The file name has microseconds so concurrent runs do not overwrite each other.
         """
         cache_dir = get_cache_dir() / "agent_context"
         cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_file = cache_dir / f"{self.name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
-        cache_file.write_text(json.dumps(context))
+        cache_file = cache_dir / f"{self.name}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.json"
+        # compact output; enums / datetimes in model dumps fall back to str
+        payload = json.dumps(context, ensure_ascii=False, separators=(",", ":"), default=str)
+        cache_file.write_bytes(payload.encode("utf-8"))
         return str(cache_file)
\ No newline at end of file
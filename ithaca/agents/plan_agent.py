@@ -1,8 +1,10 @@
 """
 Research agent
 """
-from typing import List, Callable, Dict, Any, Optional
+from typing import List, Callable, Dict, Any, Optional, Iterator, Tuple
 from pydantic import BaseModel, Field
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import json
 
 from ithaca.agents.base import BaseAgent
@@ -26,7 +28,90 @@ from ithaca.tools.meta_api import (
     get_creative_details_tool
 )
 from ithaca.logger import logger
-from ithaca.utils import get_skill_by_file_name
+from ithaca.utils import get_skill_by_file_name, compact_schema
+
+
+def _record_tool_results(tool: Callable, results: List[str]) -> Callable:
+    """
+    Wraps `tool` so that every result is appended to `results`.
+    functools.wraps keeps the name, docstring and signature Gemini builds the declaration from.
+    """
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        result = tool(*args, **kwargs)
+        results.append(f"{tool.__name__}: {result}")
+        return result
+    return wrapper
+
+
+# Static prompts, built once at import
+_SYSTEM_PROMPT = """
+        You are a plan agent.
+        You are responsible for creating a Meta Ads marketing plan 
+        for the given product step by step.
+
+        The whole marketing plan should be created in the following hierarchy:
+        - Campaign: The top level object, containing ad sets. Only one. 
+            Campaign is used to decide the blueprint of the marketing plan without details.
+        - Ad Set: Ad set is the budget and schedule unit. 
+            You should create some different ad sets for the campaign to search 
+            the marketing places.
+            A ad set must belong to a campaign.
+        - Ad: Ad is the real presentation unit. 
+            An ad must belong to a ad set.
+        - Creative: Creative is the content of the ad.
+            A creative must belong to an ad.
+        
+        Because the Meta Ads API has strict constrains, 
+        you should create the marketing plan step by step.
+        At each step, you are given the context of the previous steps.
+        The next step should be based on the context of the previous steps
+        and new instructions.
+
+        At each step, you will be provided the useful tools to create the objects.
+        """
+
+_CAMPAIGN_PROMPT = """Now, you should call the create_campaign tool to create and execute the campaign.
+After the campaign is created, you should call get_campaign_details tool to get the campaign details.
+Then, you should return the campaign details in a json format.
+The created campaign should be 'ACTIVE' status.
+"""
+
+_ADSETS_PROMPT = """Now, you should call the create_adset tool to create and execute some different ad sets for the campaign.
+After the ad sets are created, you should call get_adset_details tool to get the ad set details.
+Then, you should return the ad set details like a list in a json format.
+
+- Set budgets when creating ad sets within this campaign.
+- The budget
+- You are provided with the skill to create ad sets. Please follow the skill to create ad sets.
+- The created ad sets should be 'ACTIVE' status.
+"""
+
+# Skill for the ad set stage (2736 tokens), read from disk once
+_ADSETS_SKILL = get_skill_by_file_name("create_adsets.txt")
+
+# Max concurrent image uploads to Meta Ads
+_MAX_UPLOAD_WORKERS = 8
+
+# Tools exposed to the model at each stage, built once at import
+_CAMPAIGN_TOOLS = [
+    create_campaign_tool,
+    get_campaign_details_tool,
+]
+_ADSETS_TOOLS = [
+    create_adset_tool,
+    get_adset_details_tool,
+    # {"url_context": {}},
+    # {"google_search": {}}
+]
+_CREATIVE_TOOLS = [
+    create_single_image_creative,
+    get_creative_details_tool,
+]
+_ADS_TOOLS = [
+    create_ad_tool,
+    get_ad_details_tool,
+]
 
 
 class PlanAgentInput(BaseModel):
@@ -59,6 +144,26 @@ class PlanAgentContext(BaseModel):
     images: List[MetaAdsImage] = Field(default_factory=list, description="The list of images for the plan")
 
 
+# Wrappers for the list outputs of each stage
+class ListAdSets(BaseModel):
+    adsets: List[MetaAdsAdSet] = Field(default_factory=list, description="The list of ad sets created")
+
+
+class ListCreatives(BaseModel):
+    creatives: List[MetaAdsCreative] = Field(default_factory=list, description="The list of creatives created")
+
+
+class ListAds(BaseModel):
+    ads: List[MetaAdsAd] = Field(default_factory=list, description="The list of ads created")
+
+
+# Response schemas are fixed per model, generate them once at import
+_CAMPAIGN_SCHEMA = MetaAdsCampaign.model_json_schema()
+_ADSETS_SCHEMA = ListAdSets.model_json_schema()
+_CREATIVES_SCHEMA = ListCreatives.model_json_schema()
+_ADS_SCHEMA = ListAds.model_json_schema()
+
+
 class PlanAgent(BaseAgent):
     def __init__(
         self,
@@ -67,36 +172,7 @@ class PlanAgent(BaseAgent):
     ):
         model = "gemini-3-pro-preview"  # support schema output with tools
         tools = []  # dynamically add tools based on the stage
-        system_prompt = self._build_system_prompt()
-        super().__init__(name=name, model=model, tools=tools, max_retry=max_retry, system_prompt=system_prompt)
-    
-    def _build_system_prompt(self) -> str:
-        prompt = f"""
-        You are a plan agent.
-        You are responsible for creating a Meta Ads marketing plan 
-        for the given product step by step.
-
-        The whole marketing plan should be created in the following hierarchy:
-        - Campaign: The top level object, containing ad sets. Only one. 
-            Campaign is used to decide the blueprint of the marketing plan without details.
-        - Ad Set: Ad set is the budget and schedule unit. 
-            You should create some different ad sets for the campaign to search 
-            the marketing places.
-            A ad set must belong to a campaign.
-        - Ad: Ad is the real presentation unit. 
-            An ad must belong to a ad set.
-        - Creative: Creative is the content of the ad.
-            A creative must belong to an ad.
-        
-        Because the Meta Ads API has strict constrains, 
-        you should create the marketing plan step by step.
-        At each step, you are given the context of the previous steps.
-        The next step should be based on the context of the previous steps
-        and new instructions.
-
-        At each step, you will be provided the useful tools to create the objects.
-        """
-        return prompt
+        super().__init__(name=name, model=model, tools=tools, max_retry=max_retry, system_prompt=_SYSTEM_PROMPT)
 
     def _build_init_prompt(self, input: PlanAgentInput) -> str:
         if input.total_budget is None:
@@ -106,9 +182,9 @@ class PlanAgent(BaseAgent):
         total_budget = f"{total_budget} {input.account_info.currency}"
 
         prompt = f"""
-        User want to create a marketing plan for the product {input.product_name}.
         You are a plan agent. 
         You are responsible for creating a marketing plan for the product step by step.
+        User want to create a marketing plan for the product {input.product_name}.
         You are given the following basic information:
             - Product name: {input.product_name}
             - Product url: {input.product_url}
@@ -125,14 +201,16 @@ class PlanAgent(BaseAgent):
     def _build_prompt_with_context(self, context: PlanAgentContext) -> str:
 
         messages = context.messages
-        msg_str = ""
-        for idx, msg in enumerate(messages):
-            if idx == 0:
-                msg_str += f"Initial instruction: {msg['instruction']}\n"
-            else:
-                msg_str += f"Step {idx+1}:\n"
-                msg_str += f"Instruction: {msg['instruction']}\n"
-                msg_str += f"LLM Response: {msg['response']}\n"
+        parts = []
+        if messages:
+            parts.append(f"Initial instruction: {messages[0]['instruction']}\n")
+        for idx, msg in enumerate(messages[1:], start=1):
+            parts.append(
+                f"Step {idx+1}:\n"
+                f"Instruction: {msg['instruction']}\n"
+                f"LLM Response: {msg['response']}\n"
+            )
+        msg_str = "".join(parts)
 
         prompt = f"""
         You are given the following context of the previous steps:
@@ -141,52 +219,75 @@ class PlanAgent(BaseAgent):
         """
         return prompt
 
+    def _generate_with_tools(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        tools: List[Callable],
+        details: str,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Executes the tools, then reformats the tool turn's answer into `schema` in a second call.
+        Gemini does not return schema output from a call with custom tools, so the reformat call stays.
+        The tools create live Meta objects: once one has run, the tool turn is never sent again.
+        A failed or empty tool turn (e.g. the model ended on a tool call) is reformatted
+        from the recorded tool results instead, so no object is created twice.
+        """
+        tool_results: List[str] = []
+        try:
+            raw_res = self._generate_once(
+                prompt=prompt,
+                tools=[_record_tool_results(tool, tool_results) for tool in tools],
+                retry_if=lambda: not tool_results,
+                **kwargs
+            )
+        except Exception as e:
+            if not tool_results:
+                raise
+            logger.warning("[PlanAgent] Tool turn failed after its tools ran (%s), reformatting the tool results", e)
+            raw_res = None
+        if not raw_res or not raw_res.strip():
+            # nothing was created yet, the schema call would only make the ids up
+            if not tool_results:
+                raise ValueError(f"Empty response from the tool call, no {details} to reformat")
+            raw_res = "\n".join(tool_results)
+        schema_prompt = f"""
+        You are given the following {details}:
+        {raw_res}
+        Please return the {details} in a given schema format.
+        Schema: {json.dumps(compact_schema(schema), separators=(",", ":"))}
+        """
+        return self._generate_once(
+            prompt=schema_prompt,
+            schema=schema,
+        )
+
     def _create_campaign(self, context: PlanAgentContext, input: PlanAgentInput) -> PlanAgentContext:
         init_prompt = self._build_init_prompt(input)
         context.messages.append({
             "instruction": init_prompt,
         })
-        logger.info(f"[PlanAgent] Initial instruction: {init_prompt}")
+        logger.info("[PlanAgent] Initial instruction: %s", init_prompt)
 
-        campaign_prompt = """Now, you should call the create_campaign tool to create and execute the campaign.
-After the campaign is created, you should call get_campaign_details tool to get the campaign details.
-Then, you should return the campaign details in a json format.
-The created campaign should be 'ACTIVE' status.
-"""
-        prompt = init_prompt + campaign_prompt
-
-        campaign_tools = [
-            create_campaign_tool,
-            get_campaign_details_tool,
-        ]
-
-        campaign_schema = MetaAdsCampaign.model_json_schema()
+        prompt = init_prompt + _CAMPAIGN_PROMPT
 
         try:
-            # execute the tool
-            raw_res = self._generate_once(
+            # execute the tools, then reformat the answer into the schema
+            res = self._generate_with_tools(
                 prompt=prompt,
-                # schema=campaign_schema,
-                tools=campaign_tools,
+                schema=_CAMPAIGN_SCHEMA,
+                tools=_CAMPAIGN_TOOLS,
+                details="campaign details",
             )
-            # schema output
-            schema_prompt = f"""
-            You are given the following campaign details:
-            {raw_res}
-            Please return the campaign details in a given schema format.
-            Schema: {campaign_schema}
-            """
-            res = self._generate_once(
-                prompt=schema_prompt,
-                schema=campaign_schema,
-            )
-            res = MetaAdsCampaign.model_validate(res)
+            res = self._load_output(MetaAdsCampaign, res)
             context.campaign = res
+            res_json = res.model_dump_json()
             context.messages.append({
-                "instruction": campaign_prompt,
-                "response": f"Campaign created: {res.model_dump_json()}\n\n Campaign created with ad set level budgets. Set budgets when creating ad sets within this campaign."
+                "instruction": _CAMPAIGN_PROMPT,
+                "response": f"Campaign created: {res_json}\n\n Campaign created with ad set level budgets. Set budgets when creating ad sets within this campaign."
             })
-            logger.info(f"[PlanAgent] Campaign created: {res.model_dump_json()}")
+            logger.info("[PlanAgent] Campaign created: %s", res_json)
             return context
 
         except Exception as e:
@@ -195,187 +296,177 @@ The created campaign should be 'ACTIVE' status.
     
     def _create_adsets(self, context: PlanAgentContext) -> PlanAgentContext:
         context_prompt = self._build_prompt_with_context(context)
-        adsets_prompt = """Now, you should call the create_adset tool to create and execute some different ad sets for the campaign.
-After the ad sets are created, you should call get_adset_details tool to get the ad set details.
-Then, you should return the ad set details like a list in a json format.
-
-- Set budgets when creating ad sets within this campaign.
-- The budget
-- You are provided with the skill to create ad sets. Please follow the skill to create ad sets.
-- The created ad sets should be 'ACTIVE' status.
-"""
-        adsets_skill = get_skill_by_file_name("create_adsets.txt")  # 2736 tokens
-        prompt = context_prompt + adsets_prompt + "\n\n" + "Skill: " + adsets_skill
-
-        adsets_tools = [
-            create_adset_tool,
-            get_adset_details_tool,
-            # {"url_context": {}},
-            # {"google_search": {}}
-        ]
-
-        class ListAdSets(BaseModel):
-            adsets: List[MetaAdsAdSet] = Field(default_factory=list, description="The list of ad sets created")
-        adsets_schema = ListAdSets.model_json_schema()
+        # the skill is static, keep it ahead of the per-run context
+        prompt = "Skill: " + _ADSETS_SKILL + "\n\n" + context_prompt + _ADSETS_PROMPT
 
         try:
-            # execute the tool
-            raw_res = self._generate_once(
+            # execute the tools, then reformat the answer into the schema
+            res = self._generate_with_tools(
                 prompt=prompt,
-                # schema=adsets_schema,
-                tools=adsets_tools,
+                schema=_ADSETS_SCHEMA,
+                tools=_ADSETS_TOOLS,
+                details="ad set details",
                 max_tokens=10000,
             )
-            # schema output
-            schema_prompt = f"""
-            You are given the following ad set details:
-            {raw_res}
-            Please return the ad set details in a given schema format.
-            Schema: {adsets_schema}
-            """
-            res = self._generate_once(
-                prompt=schema_prompt,
-                schema=adsets_schema,
-            )
-            res = ListAdSets.model_validate(res)
+            res = self._load_output(ListAdSets, res, adsets=MetaAdsAdSet)
             context.adsets.extend(res.adsets)
+            res_json = res.model_dump_json()
             context.messages.append({
-                "instruction": adsets_prompt,
-                "response": f"Ad sets created: {res.model_dump_json()}"
+                "instruction": _ADSETS_PROMPT,
+                "response": f"Ad sets created: {res_json}"
             })
-            logger.info(f"[PlanAgent] Ad sets created: {res.model_dump_json()}")
+            logger.info("[PlanAgent] Ad sets created: %s", res_json)
             return context
         except Exception as e:
             logger.error(f"[PlanAgent] Error creating ad sets: {e}")
             raise e
     
-    def _create_ads(self, context: PlanAgentContext, picture_urls: List[str]) -> PlanAgentContext:
-        # 1. upload images to Meta Ads
-        for image in picture_urls:
-            upload_image_res = upload_ad_image_tool(context.account_info.account_id, image_url=image)
+    def _upload_images(self, account_id: str, picture_urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Uploads the images to Meta Ads, the uploads are independent requests so run them in parallel.
+        Does not touch the context, so it can run alongside the other stages.
+        """
+        if not picture_urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(_MAX_UPLOAD_WORKERS, len(picture_urls))) as executor:
+            return list(executor.map(
+                lambda image: upload_ad_image_tool(account_id, image_url=image),
+                picture_urls,
+            ))
+
+    def _create_creatives(
+        self,
+        context: PlanAgentContext,
+        picture_urls: List[str],
+        upload_results: List[Dict[str, Any]],
+    ) -> PlanAgentContext:
+        # 1. record the uploaded images, in the original order
+        for image, upload_image_res in zip(picture_urls, upload_results):
             image_hash = upload_image_res["image_hash"]
             context.images.append(MetaAdsImage(image_hash=image_hash, image_url=image))
+            logger.info(f"[PlanAgent] Image uploaded: {image_hash}")
+        # one history entry for all the uploads, so the history does not grow with the number of images
+        if context.images:
             context.messages.append({
-                "instruction": f"Upload image {image} to Meta Ads and get the image hash",
-                "response": f"Image uploaded: {image_hash}"
+                "instruction": "Upload the product pictures to Meta Ads and get the image hashes",
+                "response": "Images uploaded: " + ", ".join(image.image_hash for image in context.images)
             })
-            logger.info(f"[PlanAgent] Image uploaded: {image_hash}")
         # 2. create creatives
         context_prompt = self._build_prompt_with_context(context)
+        # only the fields the model needs, not the repr of the whole models
+        images_json = json.dumps(
+            [{"image_hash": image.image_hash, "image_url": image.image_url} for image in context.images],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
         creatives_prompt = f"""Now, you should call the create_single_image_creative tool to create the creatives.
 After the creatives are created, you should call get_creative_details tool to get the creative details.
 Then, you should return the creative details like a list in a json format.
-The images to be used for the creatives are: {context.images}
+The images to be used for the creatives are: {images_json}
 """
         prompt = context_prompt + creatives_prompt
 
-        creative_tools = [
-            create_single_image_creative,
-            get_creative_details_tool,
-        ]
-
-        class ListCreatives(BaseModel):
-            creatives: List[MetaAdsCreative] = Field(default_factory=list, description="The list of creatives created")
-        creative_schema = ListCreatives.model_json_schema()
-
         try:
-            # execute the tool
-            raw_res = self._generate_once(
+            # execute the tools, then reformat the answer into the schema
+            res = self._generate_with_tools(
                 prompt=prompt,
-                # schema=creative_schema,
-                tools=creative_tools,
-            )
-            # schema output
-            schema_prompt = f"""
-            You are given the following creative details:
-            {raw_res}
-            Please return the creative details in a given schema format.
-            Schema: {creative_schema}
-            """
-            res = self._generate_once(
-                prompt=schema_prompt,
-                schema=creative_schema,
+                schema=_CREATIVES_SCHEMA,
+                tools=_CREATIVE_TOOLS,
+                details="creative details",
             )
-            res = ListCreatives.model_validate(res)
+            res = self._load_output(ListCreatives, res, creatives=MetaAdsCreative)
             context.creatives.extend(res.creatives)
+            res_json = res.model_dump_json()
             context.messages.append({
                 "instruction": creatives_prompt,
-                "response": f"Creatives created: {res.model_dump_json()}"
+                "response": f"Creatives created: {res_json}"
             })
-            logger.info(f"[PlanAgent] Creatives created: {res.model_dump_json()}")
+            logger.info("[PlanAgent] Creatives created: %s", res_json)
+            return context
         except Exception as e:
             logger.error(f"[PlanAgent] Error creating creatives: {e}")
             raise e
-        # 3. create ads
+
+    def _create_ads(self, context: PlanAgentContext) -> PlanAgentContext:
         context_prompt = self._build_prompt_with_context(context)
+        # the creative details are already in the history, ids are enough here
+        creatives_json = json.dumps([{"creative_id": creative.creative_id} for creative in context.creatives])
         ads_prompt = f"""Now, you should call the create_ad tool to create and execute the ads for each ad set.
 You should plan and decide the ad for each ad set.
 After the ads are created, you should call get_ad_details tool to get the ad details.
 Then, you should return the ad details like a list in a json format.
-The creatives to be used for the ads are: {context.creatives}
+The creatives to be used for the ads are: {creatives_json}
 The created ads should be 'ACTIVE' status.
 """
         prompt = context_prompt + ads_prompt
 
-        ads_tools = [
-            create_ad_tool,
-            get_ad_details_tool,
-        ]
-
-        class ListAds(BaseModel):
-            ads: List[MetaAdsAd] = Field(default_factory=list, description="The list of ads created")
-        ads_schema = ListAds.model_json_schema()
-
         try:
-            # execute the tool
-            raw_res = self._generate_once(
+            # execute the tools, then reformat the answer into the schema
+            res = self._generate_with_tools(
                 prompt=prompt,
-                # schema=ads_schema,
-                tools=ads_tools,
-            )
-
-            # schema output
-            schema_prompt = f"""
-            You are given the following ad details:
-            {raw_res}
-            Please return the ad details in a given schema format.
-            Schema: {ads_schema}
-            """
-            res = self._generate_once(
-                prompt=schema_prompt,
-                schema=ads_schema,
+                schema=_ADS_SCHEMA,
+                tools=_ADS_TOOLS,
+                details="ad details",
             )
-            res = ListAds.model_validate(res)
+            res = self._load_output(ListAds, res, ads=MetaAdsAd)
             context.ads.extend(res.ads)
+            res_json = res.model_dump_json()
             context.messages.append({
                 "instruction": ads_prompt,
-                "response": f"Ads created: {res.model_dump_json()}"
+                "response": f"Ads created: {res_json}"
             })
-            logger.info(f"[PlanAgent] Ads created: {res.model_dump_json()}")
+            logger.info("[PlanAgent] Ads created: %s", res_json)
+            return context
         except Exception as e:
             logger.error(f"[PlanAgent] Error creating ads: {e}")
             raise e
 
-        return context    
-
-    def run(self, input: PlanAgentInput) -> PlanAgentContext:
+    def run_stream(self, input: PlanAgentInput) -> Iterator[Tuple[str, Any]]:
+        """
+        Runs the plan stage by stage, yielding `(stage, created objects)` as soon as
+        each stage is done so callers can report progress, e.g. ("adsets", [MetaAdsAdSet, ...]).
+        The last item is ("plan", context dict), the same value `run` returns.
+        """
         # step 0, build initial context
         context = PlanAgentContext(
             account_info=input.account_info,
             messages=[]
         )
-        logger.info("[PlanAgent] Step 0: PlanAgentContext: %s", context.model_dump_json())
+        # each step logs only the objects it created, the full context is cached below
         # step 1, create campaign
         context = self._create_campaign(context, input)
-        logger.info("[PlanAgent] Step 1: PlanAgentContext: %s", context.model_dump_json())
+        yield "campaign", context.campaign
         # step 2, create ad sets
-        context = self._create_adsets(context)
-        logger.info("[PlanAgent] Step 2: PlanAgentContext: %s", context.model_dump_json())
-        # step 3, create ads
-        context = self._create_ads(context, input.picture_urls)
-        logger.info("[PlanAgent] Step 3: PlanAgentContext: %s", context.model_dump_json())
+        # the image uploads only need the ad account, overlap them with the ad set stage
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            uploads = executor.submit(self._upload_images, input.account_info.account_id, input.picture_urls)
+            context = self._create_adsets(context)
+            upload_results = uploads.result()
+        yield "adsets", context.adsets
+        # step 3, create creatives and ads
+        context = self._create_creatives(context, input.picture_urls, upload_results)
+        yield "creatives", context.creatives
+        context = self._create_ads(context)
+        yield "ads", context.ads
+
+        context_dict = context.model_dump()
+        cache_file = self._cache_context(context_dict)
+        logger.info("[PlanAgent] Cached context to %s", cache_file)
+
+        yield "plan", context_dict
 
-        cache_file = self._cache_context(context.model_dump())
-        logger.info(f"[PlanAgent] Cached context to {cache_file}")
+    def run(self, input: PlanAgentInput) -> PlanAgentContext:
+        for _, result in self.run_stream(input):
+            pass
+        return result
 
-        return context.model_dump()
\ No newline at end of file
+    def run_batch(self, inputs: List[PlanAgentInput], max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        Runs the plans for several products concurrently, results are in the order of `inputs`.
+        The runs are I/O bound (Gemini and Meta Ads API), `max_workers` bounds the concurrent
+        requests to respect the rate limits.
+        """
+        if not inputs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(inputs))) as executor:
+            return list(executor.map(self.run, inputs))
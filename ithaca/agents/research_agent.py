@@ -10,6 +10,29 @@ from ithaca.agents.base import BaseAgent
 from ithaca.logger import logger
 
 
+# Static instructions, built once at import
+_TASK_PROMPT = """
+        You are a research agent.
+        You are tasked with researching the product using the tools provided, and:
+            1. Find the keywords related to the product
+            2. Summarize the research of the product:
+                - The product background
+                - The product features
+                - Suggestions for the marketing plan
+                - Any other relevant information
+            3. Find other accessible better product picture urls if possible 
+                (make sure the pictures are useful and can be downloaded from the url)
+        
+        IMPORTANT: Your research result will be used by the next agent
+        to generate a marketing plan. You should research following this goal.
+        """
+
+# the response schema is enforced by generate_json, a one-line example is enough
+_OUTPUT_FORMAT_PROMPT = """
+        Return JSON: {"picture_urls": ["original + newly found picture urls"], "keywords": ["..."], "research_summary": "..."}
+        """
+
+
 class ResearchAgentInput(BaseModel):
     product_name: str
     product_url: str
@@ -40,38 +63,17 @@ class ResearchAgent(BaseAgent):
 
     
     def _build_prompt(self, input: ResearchAgentInput) -> str:
+        # static instructions first, per-product details last
         prompt = f"""
         User want to create a marketing plan for the product {input.product_name}.
-        You are a research agent.
         You are given the following information:
             - Product name: {input.product_name}
             - Product url: {input.product_url}
             - Product picture urls: {input.picture_urls}
             - Addtional info provided by the user (Optional):
             {input.additional_data}
-
-        You are tasked with researching the product using the tools provided, and:
-            1. Find the keywords related to the product
-            2. Summarize the research of the product:
-                - The product background
-                - The product features
-                - Suggestions for the marketing plan
-                - Any other relevant information
-            3. Find other accessible better product picture urls if possible 
-                (make sure the pictures are useful and can be downloaded from the url)
-        
-        IMPORTANT: Your research result will be used by the next agent
-        to generate a marketing plan. You should research following this goal.
-        """
-        prompt += """
-        You should returen in a json format like:
-        {
-            "picture_urls": List[str] ["Product picture urls adding the new found picture urls"],
-            "keywords": List[str] ["Keywords"],
-            "research_summary": str "Research summary"
-        }
         """
-        return prompt
+        return _TASK_PROMPT + _OUTPUT_FORMAT_PROMPT + prompt
 
     def run(self, input: ResearchAgentInput) -> Dict[str, Any]:
         prompt = self._build_prompt(input)
@@ -81,7 +83,7 @@ class ResearchAgent(BaseAgent):
                 prompt=prompt,
                 schema=schema
             )
-            res = ResearchAgentOutput.model_validate(res)
+            res = self._load_output(ResearchAgentOutput, res)
             context = {
                 "messages": [
                     {
@@ -38,7 +38,7 @@ class SummaryAgent(BaseAgent):
         the effect of the update made by the UpdateAgent.
 
         Marketing Plan:
-        {input.model_dump_json(indent=2)}
+        {input.model_dump_json()}
         """
         return prompt
 
@@ -3,6 +3,8 @@ Update agent
 """
 from typing import List, Callable, Dict, Any, Optional
 from pydantic import BaseModel, Field
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 from google.genai import types
 
@@ -35,6 +37,39 @@ from ithaca.tools.meta_api import (
     get_ad_details_tool,
 )
 from ithaca.logger import logger
+from ithaca.utils import compact_schema
+
+
+# Static prompts, built once at import
+_SYSTEM_PROMPT = """
+        You are a update agent.
+        You are responsible for updating the marketing plan step by step.
+        You should check the performance of the marketing plan
+        and analyze the direction to updat, and give instructions.
+        Then you should update the marketing plan.
+        You should focus on the adsets and its budgets distribution.
+
+        You will be provided with the useful tools to complete the task at eachstep.
+        If you find error in tool response, you should try to solve it by yourself.
+        """
+
+# Tools exposed to the model at each stage, built once at import
+_INSIGHT_TOOLS = [
+    get_campaign_insights_tool,
+    get_adset_insights_tool,
+    get_ad_insights_tool,
+]
+_UPDATE_TOOLS = [
+    update_adset_tool,
+    update_ad_tool,
+    create_single_image_creative,
+    upload_ad_image_tool,
+]
+_NEW_PLAN_TOOLS = [
+    get_campaign_details_tool,
+    get_adset_details_tool,
+    get_ad_details_tool,
+]
 
 
 class UpdateAgentContext(BaseModel):
@@ -44,6 +79,17 @@ class UpdateAgentContext(BaseModel):
     messages: List[dict[str, Any]] = Field(default_factory=list, description="The list of messages for the plan")
 
 
+class NewPlan(BaseModel):
+    campaign: MetaAdsCampaign = Field(description="The campaign details")
+    adsets: List[MetaAdsAdSet] = Field(description="The adset details")
+    ads: List[MetaAdsAd] = Field(description="The ad details")
+
+
+# Response schema is fixed, generate it once at import; the compact form is only for prompt text
+_NEW_PLAN_SCHEMA = NewPlan.model_json_schema()
+_NEW_PLAN_SCHEMA_COMPACT = json.dumps(compact_schema(_NEW_PLAN_SCHEMA), separators=(",", ":"))
+
+
 class UpdateAgent(BaseAgent):
     def __init__(
         self,
@@ -52,30 +98,16 @@ class UpdateAgent(BaseAgent):
     ):
         model = "gemini-3-pro-preview"
         tools = []
-        system_prompt = self._build_system_prompt()
-        super().__init__(name=name, model=model, tools=tools, max_retry=max_retry, system_prompt=system_prompt)
-    
-    def _build_system_prompt(self) -> str:
-        prompt = f"""
-        You are a update agent.
-        You are responsible for updating the marketing plan step by step.
-        You should check the performance of the marketing plan
-        and analyze the direction to updat, and give instructions.
-        Then you should update the marketing plan.
-        You should focus on the adsets and its budgets distribution.
-
-        You will be provided with the useful tools to complete the task at eachstep.
-        If you find error in tool response, you should try to solve it by yourself.
-        """
-        return prompt
+        super().__init__(name=name, model=model, tools=tools, max_retry=max_retry, system_prompt=_SYSTEM_PROMPT)
     
     def _build_prompt_with_context(self) -> str:
         messages = self.context.messages
-        msg_str = ""
-        for idx, msg in enumerate(messages):
-                msg_str += f"Step {idx+1}:\n"
-                msg_str += f"Instruction: {msg['instruction']}\n"
-                msg_str += f"LLM Response: {msg['response']}\n"
+        msg_str = "".join(
+            f"Step {idx+1}:\n"
+            f"Instruction: {msg['instruction']}\n"
+            f"LLM Response: {msg['response']}\n"
+            for idx, msg in enumerate(messages)
+        )
 
         prompt = f"""
         You are given the following context of the previous steps:
@@ -95,27 +127,24 @@ class UpdateAgent(BaseAgent):
         insight_prompt = f"""For now, you should use tools to get the insight (performance) 
 of the marketing plan, and analyze the direction to update.
 1. You should use tools to get campaign / adsets / ads insights.
+   Call get_campaign_insights_tool, get_adset_insights_tool and get_ad_insights_tool
+   for every campaign / adset / ad id in the plan together, in a single turn of parallel function calls.
 2. You should summary the performance of the marketing plan at adsets / ads level.
 3. You should give suggestions on how to update adsets / ads.
 4. Return the detailed summary and suggestions.
 """
         prompt = self._build_plan_prompt() + insight_prompt
 
-        insight_tools = [
-            get_campaign_insights_tool,
-            get_adset_insights_tool,
-            get_ad_insights_tool,
-        ]
-
         try:
             raw_res = self._generate_once(
                 prompt=prompt,
-                tools=insight_tools,
+                tools=_INSIGHT_TOOLS,
             )
             self.context.messages.append({
                 "instruction": insight_prompt,
                 "response": raw_res,
             })
+            logger.info("[UpdateAgent] Insight: %s", raw_res)
         except Exception as e:
             logger.error(f"[UpdateAgent] Error getting insights: {e}")
             raise e
@@ -135,91 +164,88 @@ If the problem is not solvable, you should keep the original marketing plan.
 And you should return the error details.
 """
         prompt = self._build_prompt_with_context() + update_prompt
-        update_tools = [
-            update_adset_tool,
-            update_ad_tool,
-            create_single_image_creative,
-            upload_ad_image_tool,
-        ]
         try:
             raw_res = self._generate_once(
                 prompt=prompt,
-                tools=update_tools,
+                tools=_UPDATE_TOOLS,
             )
             self.context.update_details = raw_res
             self.context.messages.append({
                 "instruction": update_prompt,
                 "response": raw_res,
             })
-            logger.info(f"[UpdateAgent] Update details: {raw_res}")
+            logger.info("[UpdateAgent] Update details: %s", raw_res)
         except Exception as e:
             logger.error(f"[UpdateAgent] Error updating plan: {e}")
             raise e
     
     def _get_new_plan(self):
-        class NewPlan(BaseModel):
-            campaign: MetaAdsCampaign = Field(description="The campaign details")
-            adsets: List[MetaAdsAdSet] = Field(description="The adset details")
-            ads: List[MetaAdsAd] = Field(description="The ad details")
-        new_plan_schema = NewPlan.model_json_schema()
-
         new_plan_prompt = f"""
 Now, you have updated the marketing plan.
 You should call tools to get the details of the updated marketing plan
 including campaign / adsets / ads.
+Call the details tools for every campaign / adset / ad id together, in a single turn of parallel function calls.
 And you should return the details in a json format,
 including campaign, list of adsets and list of ads.
-Schema: {new_plan_schema}
+Schema: {_NEW_PLAN_SCHEMA}
 """
         prompt = self._build_prompt_with_context() + new_plan_prompt
-        new_plan_tools = [
-            get_campaign_details_tool,
-            get_adset_details_tool,
-            get_ad_details_tool,
-        ]
         
         try:
             # execute the tool
             raw_res = self._generate_once(
                 prompt=prompt,
-                tools=new_plan_tools,
+                tools=_NEW_PLAN_TOOLS,
             )
             # schema output
             schema_prompt = f"""
             You are given the following new plan details including campaign, list of adsets and list of ads:
             {raw_res}
             Please return the new plan details in a given schema format.
-            Schema: {new_plan_schema}
+            Schema: {_NEW_PLAN_SCHEMA_COMPACT}
             """
             res = self._generate_once(
                 prompt=schema_prompt,
-                schema=new_plan_schema,
+                schema=_NEW_PLAN_SCHEMA,
             )
-            res = NewPlan.model_validate(res)
+            res = self._load_output(NewPlan, res, campaign=MetaAdsCampaign, adsets=MetaAdsAdSet, ads=MetaAdsAd)
             self.context.updated_plan = res.model_dump()
+            new_plan_json = res.model_dump_json()
             self.context.messages.append({
                 "instruction": new_plan_prompt,
-                "response": f"New plan: {res.model_dump_json()}",
+                "response": f"New plan: {new_plan_json}",
             })
-            logger.info(f"[UpdateAgent] New plan: {res.model_dump_json()}")
+            logger.info("[UpdateAgent] New plan: %s", new_plan_json)
         except Exception as e:
             logger.error(f"[UpdateAgent] Error getting new plan: {e}")
             raise e
     
     def run(self, initial_plan: MarketingPlan) -> Dict[str, Any]:
         self.context = UpdateAgentContext(plan=initial_plan)
+        # each stage logs its own result
         self._get_insight()
-        logger.info(f"[UpdateAgent] Insight: {self.context.update_details}")
         self._update_plan()
-        logger.info(f"[UpdateAgent] Update details: {self.context.update_details}")
         self._get_new_plan()
-        logger.info(f"[UpdateAgent] New plan: {self.context.updated_plan}")
 
         cache_file = self._cache_context(self.context.model_dump())
-        logger.info(f"[PlanAgent] Cached context to {cache_file}")
+        logger.info("[UpdateAgent] Cached context to %s", cache_file)
 
         return {
             "updated_plan": self.context.updated_plan,
             "update_details": self.context.update_details,
         }
-    
+
+    def run_batch(self, plans: List[MarketingPlan], max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        Updates several plans concurrently, results are in the order of `plans`.
+        The three stages of one update depend on each other, so the plans run side by side instead,
+        each on its own agent since `run` keeps the context on the instance.
+        `max_workers` bounds the concurrent Gemini / Meta Ads API requests.
+        """
+        if not plans:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(plans))) as executor:
+            return list(executor.map(
+                lambda plan: UpdateAgent(name=self.name, max_retry=self.max_retry).run(plan),
+                plans,
+            ))
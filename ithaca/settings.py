@@ -28,3 +28,7 @@ GEMINI_API_KEY = ""  # yours
 
 # agents
 AGENT_CONFIG_FILE = ""
+# Re-validate schema outputs from the LLM with pydantic (debug only, Gemini already enforces the schema)
+VALIDATE_AGENT_OUTPUT = False
+# Cache tool-free LLM responses on disk, keyed on model + prompt + schema (dev/test runs only)
+CACHE_AGENT_RESPONSES = False
@@ -1,6 +1,65 @@
-from ithaca.tools.webtools import *
-from ithaca.tools.meta_api import *
-from ithaca.tools.random import random_uuid
+import importlib
+
+# Tool submodules are imported on first attribute access (PEP 562), so that
+# importing ithaca.tools.meta_api does not also pull in the web tools and
+# their dependencies. Only the tools listed here are exported.
+_TOOL_EXPORTS = {
+    "ithaca.tools.webtools": (
+        "grounding_tool",
+        "web_search",
+        "web_summary",
+        "fetch_pictures_from_web",
+    ),
+    "ithaca.tools.meta_api": (
+        "common_api_call_tool",
+        "get_ad_accounts_tool",
+        "get_ad_account_info_tool",
+        "get_pages_for_account_tool",
+        "get_pages_by_name_tool",
+        "get_campaign_details_tool",
+        "get_campaigns_tool",
+        "create_campaign_tool",
+        "get_adsets_tool",
+        "get_adset_details_tool",
+        "create_adset_tool",
+        "get_ads_tool",
+        "get_ad_details_tool",
+        "create_ad_tool",
+        "get_creative_by_account_tool",
+        "get_creatives_by_ad_tool",
+        "get_creative_details_tool",
+        "create_creative_tool",
+        "create_single_image_creative",
+        "upload_ad_image_tool",
+        "GOOGLE_TOOLS",
+    ),
+    "ithaca.tools.random": (
+        "random_uuid",
+    ),
+}
+
+# exported name -> module that defines it
+_TOOL_MODULES = {
+    name: module_name
+    for module_name, names in _TOOL_EXPORTS.items()
+    for name in names
+}
+
+__all__ = list(_TOOL_MODULES)
+
+
+def __getattr__(name: str):
+    module_name = _TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 # all_tools = [
 #     web_summary, fetch_product_picture,
@@ -15,7 +15,7 @@ import asyncio
 from langchain.tools import tool
 
 from ithaca.tools.meta_api.meta_ads_api import make_api_request, meta_api_tool
-from ithaca.tools.meta_api.utils import APIToolErrors, concise_return_message
+from ithaca.tools.meta_api.utils import APIToolErrors, concise_return_message, details_cache
 from ithaca.tools.meta_api.utils import STATUS_VALIDATOR
 
 
@@ -111,7 +111,7 @@ def get_ad_details_tool(
     Args:
         ad_id: Meta Ads ad ID
     """
-    return asyncio.run(_get_ad_details_kernel(ad_id))
+    return details_cache.get_or_fetch(ad_id, lambda: asyncio.run(_get_ad_details_kernel(ad_id)))
 
 
 @meta_api_tool
@@ -226,6 +226,8 @@ async def _create_ad_kernel(
     
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        # a new ad changes its ad set
+        details_cache.invalidate(adset_id)
         # return json.dumps(data, indent=2)
         return concise_return_message(data, params=params)
     except Exception as e:
@@ -286,6 +288,7 @@ async def _update_ad_kernel(
 
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        details_cache.invalidate(ad_id)
         return concise_return_message(data, params=params)
     except Exception as e:
         return APIToolErrors.api_call_error(
@@ -313,6 +316,7 @@ async def delete_ad(
     endpoint = f"{ad_id}"
     try:
         data = await make_api_request(endpoint, access_token, None, method="DELETE")
+        details_cache.invalidate(ad_id)
         return json.dumps(data, indent=2)
     except Exception as e:
         return APIToolErrors.api_call_error(
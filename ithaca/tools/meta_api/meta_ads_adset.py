@@ -19,7 +19,7 @@ import asyncio
 from langchain.tools import tool
 
 from ithaca.tools.meta_api.meta_ads_api import make_api_request, meta_api_tool
-from ithaca.tools.meta_api.utils import valid_account_id, APIToolErrors, concise_return_message
+from ithaca.tools.meta_api.utils import valid_account_id, APIToolErrors, concise_return_message, details_cache
 from ithaca.tools.meta_api.utils import enum_arg_validators
 
 
@@ -57,7 +57,7 @@ def get_adset_details_tool(adset_id: str):
     Args:
         adset_id: Meta Ads ad set ID
     """
-    return asyncio.run(_get_adset_details_kernel(adset_id))
+    return details_cache.get_or_fetch(adset_id, lambda: asyncio.run(_get_adset_details_kernel(adset_id)))
 
 
 @meta_api_tool
@@ -287,6 +287,8 @@ async def _create_adset_kernel(
     
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        # a new ad set changes its campaign
+        details_cache.invalidate(campaign_id)
         return concise_return_message(data, params)
     except Exception as e:
         error_msg = str(e)
@@ -407,6 +409,7 @@ async def _update_adset_kernel(
     
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        details_cache.invalidate(adset_id)
         return concise_return_message(data, params)
     except Exception as e:
         return APIToolErrors.api_call_error(
@@ -434,6 +437,7 @@ async def delete_adset(
     endpoint = f"{adset_id}"
     try:
         data = await make_api_request(endpoint, access_token, None, method="DELETE")
+        details_cache.invalidate(adset_id)
         return json.dumps(data, indent=2)
     except Exception as e:
         return APIToolErrors.api_call_error(
@@ -13,6 +13,7 @@ import os
 from ithaca.oauth.auth import auth_manager
 from ithaca.logger import logger
 from ithaca.settings import META_GRAPH_API_VERSION, META_GRAPH_API_BASE, USER_AGENT
+from ithaca.tools.meta_api.utils import details_cache, is_transient_error
 
 
 # Log key environment and configuration at startup
@@ -32,12 +33,17 @@ class GraphAPIError(Exception):
         logger.debug(f"Error details: {error_data}")
         
         # Check if this is an auth error
-        if "code" in error_data and error_data["code"] in [190, 102, 4]:
+        if "code" in error_data and error_data["code"] in [190, 102]:
             # Common auth error codes
             logger.warning(f"Auth error detected (code: {error_data['code']}). Invalidating token.")
             # auth_manager.invalidate_token()
 
 
+# Transient Graph API failures are retried here, instead of costing the model another round-trip
+_MAX_API_RETRIES = 3
+_API_RETRY_BASE_DELAY = 1.0  # 1s, 2s, 4s
+
+
 async def make_api_request(
     endpoint: str,
     access_token: str,
@@ -46,6 +52,34 @@ async def make_api_request(
 ) -> Dict[str, Any]:
     """
     Make a request to the Meta Graph API.
+    Throttling, transient server errors and transport failures are retried with exponential backoff.
+
+    Args:
+        endpoint: API endpoint path (without base URL)
+        access_token: Meta API access token
+        params: Additional query parameters
+        method: HTTP method (GET, POST, DELETE)
+
+    Returns:
+        API response as a dictionary
+    """
+    for attempt in range(_MAX_API_RETRIES + 1):
+        result = await _make_api_request_once(endpoint, access_token, params, method)
+        if attempt == _MAX_API_RETRIES or not is_transient_error(result, method):
+            return result
+        delay = _API_RETRY_BASE_DELAY * 2 ** attempt
+        logger.warning(f"Transient Graph API error on {method} {endpoint}, retrying in {delay}s")
+        await asyncio.sleep(delay)
+
+
+async def _make_api_request_once(
+    endpoint: str,
+    access_token: str,
+    params: Optional[Dict[str, Any]] = None,
+    method: str = "GET"
+) -> Dict[str, Any]:
+    """
+    Make a single request to the Meta Graph API.
     
     Args:
         endpoint: API endpoint path (without base URL)
@@ -73,7 +107,8 @@ async def make_api_request(
         "User-Agent": USER_AGENT,
     }
     
-    request_params = params or {}
+    # copy so retries and callers never see the token or the JSON-encoded values
+    request_params = dict(params or {})
     request_params["access_token"] = access_token
     
     # Logging the request (masking token for security)
@@ -143,7 +178,7 @@ async def make_api_request(
             elif "error" in error_info:
                 error_obj = error_info.get("error", {})
                 # Check for specific FB API errors related to auth
-                if isinstance(error_obj, dict) and error_obj.get("code") in [190, 102, 4, 200, 10]:
+                if isinstance(error_obj, dict) and error_obj.get("code") in [190, 102, 200, 10]:
                     logger.warning(f"Detected Facebook API auth error: {error_obj.get('code')}")
                     # Log more details about app ID related errors
                     if error_obj.get("code") == 200 and "Provide valid app ID" in error_obj.get("message", ""):
@@ -178,6 +213,18 @@ async def make_api_request(
                 }
             }
         
+        except httpx.TransportError as e:
+            # timeouts and connection failures carry no response, mark them for the retry
+            logger.error(f"Transport Error: {e!r}")
+            return {
+                "error": {
+                    "message": f"Transport Error: {e!r}",
+                    "transport_error": True,
+                    # no connection was made, the request never reached the API
+                    "request_sent": not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)),
+                }
+            }
+        
         except Exception as e:
             logger.error(f"Request Error: {str(e)}")
             return {"error": {"message": str(e)}}
@@ -245,4 +292,8 @@ async def common_api_call_tool(
     Returns:
         API response as a dictionary
     """
-    return await make_api_request(endpoint, access_token, params, method)
\ No newline at end of file
+    result = await make_api_request(endpoint, access_token, params, method)
+    if method != "GET":
+        # any object may have changed, drop every cached detail
+        details_cache.clear()
+    return result
\ No newline at end of file
@@ -10,7 +10,7 @@ import json
 from langchain.tools import tool
 
 from ithaca.tools.meta_api.meta_ads_api import make_api_request, meta_api_tool
-from ithaca.tools.meta_api.utils import APIToolErrors
+from ithaca.tools.meta_api.utils import APIToolErrors, details_cache
 
 
 # TODO: for now, set campaign level budget schedule only, 
@@ -56,6 +56,7 @@ async def create_budget_schedule(
 
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        details_cache.invalidate(campaign_id)
         return json.dumps(data, indent=2)
     except Exception as e:
         return APIToolErrors.api_call_error(
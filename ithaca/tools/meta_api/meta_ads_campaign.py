@@ -21,7 +21,7 @@ import asyncio
 from langchain.tools import tool
 
 from ithaca.tools.meta_api.meta_ads_api import make_api_request, meta_api_tool
-from ithaca.tools.meta_api.utils import valid_account_id, APIToolErrors, concise_return_message
+from ithaca.tools.meta_api.utils import valid_account_id, APIToolErrors, concise_return_message, details_cache
 from ithaca.tools.meta_api.utils import (
     EFFECTIVE_STATUS_VALIDATOR, 
     STATUS_VALIDATOR, 
@@ -110,7 +110,7 @@ def get_campaign_details_tool(campaign_id: str):
     Args:
         campaign_id: Meta Ads campaign ID
     """
-    return asyncio.run(_get_campaign_details_kernel(campaign_id))
+    return details_cache.get_or_fetch(campaign_id, lambda: asyncio.run(_get_campaign_details_kernel(campaign_id)))
 
 
 @meta_api_tool
@@ -465,6 +465,7 @@ async def update_campaign(
 
     try:
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        details_cache.invalidate(campaign_id)
         
         # Add a note about budget strategy if switching to ad set level budgets
         if use_adset_level_budgets is not None and use_adset_level_budgets:
@@ -499,6 +500,7 @@ async def delete_campaign(
     endpoint = f"{campaign_id}"
     try:
         data = await make_api_request(endpoint, access_token, None, method="DELETE")
+        details_cache.invalidate(campaign_id)
         return json.dumps(data, indent=2)
     except Exception as e:
         return APIToolErrors.api_call_error(
@@ -544,6 +546,8 @@ async def unassociate_campaign(
     
     try:
         data = await make_api_request(endpoint, access_token, params, method="DELETE")
+        # the deleted campaigns are not known here, drop every cached detail
+        details_cache.clear()
         return json.dumps({
             "message": f"Campaigns unassociated successfully from account: {account_id}",
             "details": data,
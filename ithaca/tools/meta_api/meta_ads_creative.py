@@ -38,7 +38,7 @@ from langchain.tools import tool
 
 from ithaca.logger import logger
 from ithaca.tools.meta_api.meta_ads_api import make_api_request, meta_api_tool
-from ithaca.tools.meta_api.utils import APIToolErrors, valid_account_id
+from ithaca.tools.meta_api.utils import APIToolErrors, valid_account_id, details_cache
 from ithaca.tools.meta_api.utils import STATUS_VALIDATOR, concise_return_message
 from ithaca.tools.meta_api.meta_ads_page import _discover_pages_for_account
 
@@ -170,7 +170,7 @@ def get_creative_details_tool(
     Args:
         creative_id: Meta Ads creative ID
     """
-    return asyncio.run(_get_creative_details_kernel(creative_id))
+    return details_cache.get_or_fetch(creative_id, lambda: asyncio.run(_get_creative_details_kernel(creative_id)))
 
 
 @meta_api_tool
@@ -529,6 +529,7 @@ async def update_creative(
     try:
         # Make API request to update the creative
         data = await make_api_request(endpoint, access_token, params, method="POST")
+        details_cache.invalidate(creative_id)
         
         # If successful, get more details about the updated creative
         if "id" in data:
@@ -568,6 +569,7 @@ async def delete_creative(
     endpoint = f"{creative_id}"
     try:
         data = await make_api_request(endpoint, access_token, None, method="DELETE")
+        details_cache.invalidate(creative_id)
         return json.dumps(data, indent=2)
     except Exception as e:
         return APIToolErrors.api_call_error(
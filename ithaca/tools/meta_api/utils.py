@@ -2,8 +2,10 @@
 Utility functions for Meta Ads API.
 """
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Union, Callable, Tuple
 import json
+import threading
+import time
 
 
 # For tool error
@@ -207,4 +209,86 @@ def concise_return_message(data, params: Optional[Dict] = None) -> str:
                 "params_sent": params,
             }
         return json.dumps(error_msg, indent=2)
-    return json.dumps(data, indent=2)
\ No newline at end of file
+    return json.dumps(data, indent=2)
+
+
+
+# For make_api_request retries
+_RETRY_STATUS_CODES = {500, 502, 503, 504}
+# app / user / page / call rate throttling, plus the Ads Management business use case limits
+_RETRY_ERROR_CODES = {4, 17, 32, 613} | set(range(80000, 80015))
+
+
+def is_transient_error(result: Dict[str, Any], method: str) -> bool:
+    """Whether a make_api_request result is a transient failure that is safe to send again."""
+    error = result.get("error") if isinstance(result, dict) else None
+    if not isinstance(error, dict):
+        return False
+    # timeouts / connection errors, a POST that reached the API may have been applied
+    if error.get("transport_error") is True:
+        return method != "POST" or error.get("request_sent") is False
+    status_code = (error.get("full_response") or {}).get("status_code")
+    details = error.get("details")
+    details_error = details.get("error") if isinstance(details, dict) else None
+    error_code = details_error.get("code") if isinstance(details_error, dict) else None
+    # throttled requests were not applied, safe to send again
+    if status_code == 429 or error_code in _RETRY_ERROR_CODES:
+        return True
+    # Graph API flags temporary failures explicitly
+    if isinstance(details_error, dict) and details_error.get("is_transient") is True:
+        return True
+    # a POST failing with 5xx may still have been applied, retrying could create duplicates
+    return method != "POST" and status_code in _RETRY_STATUS_CODES
+
+# For get_*_details tools
+class DetailsCache:
+    """
+    Short lived cache of the get_*_details tool results, keyed on the object id.
+    The agents read back the objects they just created, often more than once in a stage,
+    so a hit saves a Graph API round-trip. Update / delete calls invalidate the object.
+    """
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        # bumped on every invalidate / clear; a fetch that overlapped one is not stored,
+        # otherwise a read started before an update would be served for the whole ttl
+        self._version = 0
+        self._invalidated: Dict[str, int] = {}
+        self._cleared = 0
+
+    def get_or_fetch(self, object_id: str, fetch: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(object_id)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            version = self._version
+
+        result = fetch()
+        # only successful reads are cached, they always contain the object id
+        try:
+            data = json.loads(result) if isinstance(result, str) else result
+        except json.JSONDecodeError:
+            return result
+        if isinstance(data, dict) and "id" in data and "error" not in data:
+            with self._lock:
+                if self._cleared <= version and self._invalidated.get(object_id, 0) <= version:
+                    self._entries[object_id] = (now + self.ttl, result)
+        return result
+
+    def invalidate(self, object_id: str) -> None:
+        with self._lock:
+            self._version += 1
+            self._invalidated[object_id] = self._version
+            self._entries.pop(object_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._cleared = self._version
+            self._invalidated.clear()
+            self._entries.clear()
+
+
+details_cache = DetailsCache()
@@ -1,5 +1,6 @@
 import platform
 import pathlib
+from typing import Any, Dict
 
 from ithaca.settings import CACHE_DIR
 
@@ -25,4 +26,58 @@ def get_skill_by_file_name(file_name: str) -> str:
     if not file_path.exists():
         raise FileNotFoundError(f"Skill file {file_path} not found")
     with open(file_path, "r") as f:
-        return f.read()
\ No newline at end of file
+        return f.read()
+
+
+# keys only meant for humans, the model does not need them to follow a schema
+_SCHEMA_DOC_KEYS = ("title", "description")
+
+
+def compact_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a copy of a json schema without "title" / "description" annotations
+    and without unreferenced "$defs", to embed it in a prompt with fewer tokens.
+    Use the full schema for `response_json_schema`, the compact one only in prompt text.
+    """
+    def strip(node: Any) -> Any:
+        if isinstance(node, list):
+            return [strip(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        compact = {}
+        for key, value in node.items():
+            if key in _SCHEMA_DOC_KEYS and not isinstance(value, dict):
+                continue
+            if key in ("properties", "$defs"):
+                # keys here are field / model names, not annotations
+                compact[key] = {name: strip(sub) for name, sub in value.items()}
+            else:
+                compact[key] = strip(value)
+        return compact
+
+    def collect_refs(node: Any, refs: set) -> None:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/$defs/"):
+                refs.add(ref[len("#/$defs/"):])
+            for value in node.values():
+                collect_refs(value, refs)
+        elif isinstance(node, list):
+            for item in node:
+                collect_refs(item, refs)
+
+    compact = strip(schema)
+    defs = compact.pop("$defs", None)
+    if defs:
+        # follow refs from the root, then through the defs they pull in
+        used, pending = set(), set()
+        collect_refs(compact, pending)
+        while pending:
+            name = pending.pop()
+            if name in used or name not in defs:
+                continue
+            used.add(name)
+            collect_refs(defs[name], pending)
+        if used:
+            compact["$defs"] = {name: sub for name, sub in defs.items() if name in used}
+    return compact
@@ -82,13 +82,15 @@ class BaseWorkFlow(ABC):
         account_info['dsa_compliance_note'] = res['dsa_compliance_note']
         
         # get page
+        pages = None
         if page_name:
             try:
                 pages = get_pages_by_name_tool(account_id, page_name)
                 logger.info(f"Find {pages['total_available']} pages, use first one.")
                 page = pages['data'][0]
             except Exception as e:
-                logger.error(f"Can not get pages from response: {res}")
+                logger.error("Can not get pages from response: %s", e)
+                logger.debug("Pages response: %.2000r", pages)
                 raise e
         else:
             try:
@@ -96,7 +98,8 @@ class BaseWorkFlow(ABC):
                 logger.info(f"Find {pages['total_pages_found']} pages, use first one.")
                 page = pages['data'][0]
             except Exception as e:
-                logger.error(f"Can not get pages from response: {res}")
+                logger.error("Can not get pages from response: %s", e)
+                logger.debug("Pages response: %.2000r", pages)
                 raise e
 
         account_info['page_id'] = page['id']
@@ -46,8 +46,8 @@ class MarketingInitInput(BaseModel):
     """
     The initial input of a marketing plan.
     """
-    product_name: str
-    product_url: str
+    product_name: str = Field(min_length=1)
+    product_url: str = Field(min_length=1)
     total_budget: Optional[float] = None
     total_days: Optional[int] = None
     product_picture_urls: Optional[List[str]] = Field(default_factory=list)
@@ -247,7 +247,8 @@ class MarketingPlan(BaseModel):
     in_history: bool = Field(default=False)
 
     def convert_to_history(self) -> MarketingHistory:
-        assert self.is_finished, "Marketing is not finished, can not summary."
+        if not self.is_finished:
+            raise ValueError("Marketing is not finished, can not summary.")
         hist = MarketingHistory(
             marketing_id=self.plan_id,
             marketing_input=self.marketing_init_input.to_str(),
@@ -126,7 +126,8 @@ class DemoWorkFlow(BaseWorkFlow):
         self.plan.meta_ads_campaign = plan_res["campaign"]
         self.plan.meta_ads_adsets = plan_res["adsets"]
         self.plan.meta_ads_ads = plan_res["ads"]
-        self.plan.update_logs.append(f"Plan created: {json.dumps(plan_res)}")
+        # compact: the update logs are fed back into the summary / history prompts
+        self.plan.update_logs.append(f"Plan created: {json.dumps(plan_res, ensure_ascii=False, separators=(',', ':'))}")
         self.plan.created_time = datetime.now().isoformat()
         self.plan.start_time = datetime.now().isoformat()
         self.plan.status = MarketingPlanStatus.ACTIVE
@@ -177,7 +178,7 @@ class DemoWorkFlow(BaseWorkFlow):
 
     def __str__(self):
         return (
-            f"DemoWorkFlow with{"out" if not self.hist else ""} history:\n\n"
+            f"DemoWorkFlow with{'out' if not self.hist else ''} history:\n\n"
             f"Input:\n"
             f"{self.plan_init_input.to_str()}"
         )
@@ -0,0 +1,176 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("sqlmodel")
+
+from bk.db import ithacadb
+from bk.db import IthacaDB, HistoryModel
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """IthacaDB on a fresh SQLite file"""
+    monkeypatch.setattr(ithacadb, "DB_PATH", tmp_path / "ithaca.db")
+    monkeypatch.setattr(IthacaDB, "_db_engine", None)
+    monkeypatch.setattr(IthacaDB, "_db_available", False)
+    monkeypatch.setattr(IthacaDB, "_check_deadline", 0.0)
+    yield IthacaDB
+    if IthacaDB._db_engine is not None:
+        IthacaDB._db_engine.dispose()
+
+
+def _history(db):
+    assert db.add([
+        HistoryModel(product_name="iPhone", plan_uuid="u1", plan_score=7.0, created_at=datetime(2024, 1, 1)),
+        HistoryModel(product_name="iPhone", plan_uuid="u2", plan_score=9.0, created_at=datetime(2024, 1, 2)),
+        HistoryModel(product_name="Pixel", plan_uuid="u3", plan_score=8.0, created_at=datetime(2024, 1, 3)),
+    ])
+
+
+def test_advanced_query_returns_models(db):
+    _history(db)
+    rows = db.advanced_query(HistoryModel, filters={"plan_score": {">=": 8.0}}, order_by="plan_score")
+    assert [row.plan_uuid for row in rows] == ["u2", "u3"]
+    assert all(isinstance(row, HistoryModel) for row in rows)
+
+
+def test_advanced_query_projection(db):
+    _history(db)
+    rows = db.advanced_query(
+        HistoryModel,
+        filters={"product_name": "iPhone"},
+        order_by="created_at",
+        limit=5,
+        columns=["plan_uuid", "plan_score"],
+    )
+    assert [tuple(row) for row in rows] == [("u2", 9.0), ("u1", 7.0)]
+
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"plan_score": {">": 7.0, "<": 9.0}}, ["u3"]),
+    ({"plan_score": {"<=": 8.0}}, ["u1", "u3"]),
+    ({"product_name": {"!=": "iPhone"}}, ["u3"]),
+    ({"product_name": {"like": "iP%"}}, ["u1", "u2"]),
+    ({"plan_uuid": {"in": ["u1", "u3"]}}, ["u1", "u3"]),
+    ({"plan_uuid": {"not_in": ["u1", "u3"]}}, ["u2"]),
+    ({"plan_uuid": {"unknown": "u2"}}, ["u2"]),
+])
+def test_advanced_query_operators(db, filters, expected):
+    _history(db)
+    rows = db.advanced_query(HistoryModel, filters=filters, order_by="plan_uuid", order_desc=False)
+    assert [row.plan_uuid for row in rows] == expected
+
+
+def test_advanced_query_time_filters(db):
+    _history(db)
+    db.add(HistoryModel(product_name="Pixel", plan_uuid="u4", created_at=datetime.now()))
+
+    def uuids(time_filters):
+        rows = db.advanced_query(HistoryModel, time_filters=time_filters, order_by="plan_uuid", order_desc=False)
+        return [row.plan_uuid for row in rows]
+
+    assert uuids({"created_at_after": datetime(2024, 1, 2)}) == ["u2", "u3", "u4"]
+    assert uuids({"created_at_before": datetime(2024, 1, 2)}) == ["u1", "u2"]
+    assert uuids({"created_at_within": timedelta(days=1)}) == ["u4"]
+    assert uuids({"created_at_around": datetime(2024, 1, 2)}) == ["u1", "u2", "u3", "u4"]
+
+def test_engine_uses_wal_and_small_pool(db):
+    engine = db.get_db_engine()
+    assert engine.pool.size() == 5
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+
+def test_check_db_available_trusts_deadline(db, monkeypatch):
+    assert db.check_db_available()
+    assert db._check_deadline > 0
+
+    def broken():
+        raise RuntimeError("no engine")
+
+    monkeypatch.setattr(db, "get_db_engine", broken)
+    # within the deadline no probe runs
+    assert db.check_db_available()
+    # a forced or expired check probes again and clears availability on failure
+    assert not db.check_db_available(force=True)
+    assert not db._db_available and db._check_deadline == 0.0
+    assert not db.check_db_available()
+
+def test_concurrent_adds_are_serialized(db):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def add(i):
+        return db.add(HistoryModel(product_name="iPhone", plan_uuid=f"u{i}"))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(add, range(32)))
+    assert len(db.query(HistoryModel, {"product_name": "iPhone"})) == 32
+
+
+def test_bulk_add_writes_ids_back(db):
+    rows = [HistoryModel(product_name="iPhone", plan_uuid=f"u{i}") for i in range(3)]
+    rows.append(HistoryModel(id=100, product_name="iPhone", plan_uuid="u3"))
+    assert db.add(rows)
+    ids = [row.id for row in rows]
+    assert None not in ids and len(set(ids)) == 4 and ids[-1] == 100
+    stored = {row.plan_uuid: row.id for row in db.query(HistoryModel, {"product_name": "iPhone"})}
+    assert stored == {row.plan_uuid: row.id for row in rows}
+
+
+@pytest.mark.parametrize("refresh", [True, False])
+def test_update_keeps_objects_readable(db, refresh):
+    _history(db)
+    row = db.query(HistoryModel, {"plan_uuid": "u1"})[0]
+    row.plan_score = 5.0
+    assert db.update(row, refresh=refresh)
+    assert row.plan_score == 5.0
+    assert db.query(HistoryModel, {"plan_uuid": "u1"})[0].plan_score == 5.0
+
+
+_HISTORY_INDEXES = {
+    "ix_history_product_name", "ix_history_plan_score", "ix_history_created_at", "ix_history_score_created",
+}
+
+
+def _index_names(engine):
+    with engine.connect() as conn:
+        return {row[1] for row in conn.exec_driver_sql("PRAGMA index_list('history')")}
+
+
+def test_history_indexes_on_new_database(db):
+    assert _HISTORY_INDEXES <= _index_names(db.get_db_engine())
+
+
+def test_history_indexes_added_to_existing_database(db, tmp_path):
+    import sqlite3
+
+    # a history table from before the indexes existed
+    conn = sqlite3.connect(tmp_path / "ithaca.db")
+    conn.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, product_name VARCHAR, plan_score FLOAT, created_at DATETIME)")
+    conn.commit()
+    conn.close()
+    assert _HISTORY_INDEXES <= _index_names(db.get_db_engine())
+
+
+def test_first_and_exists(db):
+    _history(db)
+    assert db.first(HistoryModel, {"product_name": "Pixel"}).plan_uuid == "u3"
+    assert db.first(HistoryModel, {"product_name": "Galaxy"}) is None
+    assert db.exists(HistoryModel, {"plan_uuid": "u2"}) is True
+    assert db.exists(HistoryModel, {"plan_uuid": "u9"}) is False
+    assert db.exists(HistoryModel) is True
+
+
+def test_stream_yields_all_matching_rows(db):
+    _history(db)
+    rows = db.stream(HistoryModel, {"product_name": "iPhone"}, chunk=1)
+    assert sorted(row.plan_uuid for row in rows) == ["u1", "u2"]
+    assert len(list(db.stream(HistoryModel))) == 3
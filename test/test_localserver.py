@@ -0,0 +1,60 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "auxiliary"))
+
+from localserver import PolicyHandler, _NOT_FOUND_RESPONSE, _PRIVACY_RESPONSE, _parse_query
+
+
+def test_parse_query_keeps_first_value():
+    params = _parse_query("code=abc&state=s1&code=def")
+    assert params == {"code": "abc", "state": "s1"}
+
+
+def test_parse_query_drops_blank_and_decodes():
+    params = _parse_query("code=&error=access+denied&=x&state&msg=a%26b")
+    assert params == {"error": "access denied", "msg": "a&b"}
+
+
+def _make_handler(request_version):
+    handler = PolicyHandler.__new__(PolicyHandler)
+    handler.wfile = BytesIO()
+    handler.request_version = request_version
+    handler.requestline = "GET /data HTTP/1.1"
+    handler.client_address = ("127.0.0.1", 0)
+    handler.log_request = lambda *args: None
+    return handler
+
+
+def test_send_prebuilt_adds_date():
+    handler = _make_handler("HTTP/1.1")
+    handler._send_prebuilt(_PRIVACY_RESPONSE)
+    head, _, body = handler.wfile.getvalue().partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"\r\nDate: " in head
+    assert b"Cache-Control: public, max-age=3600" in head
+    assert f"Content-Length: {len(body)}".encode() in head
+    assert body == _PRIVACY_RESPONSE[2]
+
+
+def test_send_prebuilt_http09_has_no_headers():
+    handler = _make_handler("HTTP/0.9")
+    handler._send_prebuilt(_NOT_FOUND_RESPONSE)
+    assert handler.wfile.getvalue() == _NOT_FOUND_RESPONSE[2]
+
+
+def test_send_body_single_write():
+    handler = _make_handler("HTTP/1.1")
+    handler._send_body(200, "application/json; charset=utf-8", b'{"ok": true}')
+    head, _, body = handler.wfile.getvalue().partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"\r\nDate: " in head
+    assert b"Content-Length: 12" in head
+    assert body == b'{"ok": true}'
+
+
+def test_send_body_http09_has_no_headers():
+    handler = _make_handler("HTTP/0.9")
+    handler._send_body(404, "text/html; charset=utf-8", b"<p>missing</p>")
+    assert handler.wfile.getvalue() == b"<p>missing</p>"
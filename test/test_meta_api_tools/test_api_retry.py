@@ -0,0 +1,67 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# loaded by path: importing the meta_api package pulls in langchain and the Meta auth flow
+_UTILS_PATH = Path(__file__).parent.parent.parent / "ithaca" / "tools" / "meta_api" / "utils.py"
+_spec = importlib.util.spec_from_file_location("meta_api_utils", _UTILS_PATH)
+meta_api_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(meta_api_utils)
+
+is_transient_error = meta_api_utils.is_transient_error
+
+
+def _http_error(status_code, code=None, **error):
+    """Shaped like the HTTPStatusError result of make_api_request"""
+    if code is not None:
+        error["code"] = code
+    return {
+        "error": {
+            "message": f"HTTP Error: {status_code}",
+            "details": {"error": error},
+            "full_response": {"status_code": status_code},
+        }
+    }
+
+
+def _transport_error(request_sent):
+    return {"error": {"message": "Transport Error", "transport_error": True, "request_sent": request_sent}}
+
+
+@pytest.mark.parametrize("method", ["GET", "POST", "DELETE"])
+@pytest.mark.parametrize("result", [
+    _http_error(429),
+    _http_error(400, code=4),
+    _http_error(400, code=17),
+    _http_error(400, code=32),
+    _http_error(400, code=613),
+    _http_error(400, code=80004),
+    _http_error(400, code=100, is_transient=True),
+    _transport_error(request_sent=False),
+])
+def test_retried_for_any_method(result, method):
+    assert is_transient_error(result, method)
+
+
+@pytest.mark.parametrize("result", [_http_error(500), _http_error(503, code=2), _transport_error(request_sent=True)])
+def test_retried_unless_post(result):
+    assert is_transient_error(result, "GET")
+    assert is_transient_error(result, "DELETE")
+    # the POST may have been applied
+    assert not is_transient_error(result, "POST")
+
+
+@pytest.mark.parametrize("result", [
+    {"id": "123"},
+    {"data": []},
+    "not a dict",
+    {"error": "plain message"},
+    {"error": {"message": "Unsupported HTTP method: PUT"}},
+    _http_error(400, code=100),
+    _http_error(401, code=190),
+    _http_error(400, code=80015),
+])
+def test_not_retried(result):
+    assert not is_transient_error(result, "GET")
+    assert not is_transient_error(result, "POST")
@@ -0,0 +1,90 @@
+import importlib.util
+import json
+from pathlib import Path
+
+# loaded by path: importing the meta_api package pulls in langchain and the Meta auth flow
+_UTILS_PATH = Path(__file__).parent.parent.parent / "ithaca" / "tools" / "meta_api" / "utils.py"
+_spec = importlib.util.spec_from_file_location("meta_api_utils", _UTILS_PATH)
+meta_api_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(meta_api_utils)
+
+DetailsCache = meta_api_utils.DetailsCache
+
+
+class _Fetch:
+    def __init__(self, result, during=None):
+        self.result = result
+        self.during = during
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.during is not None:
+            self.during()
+        return self.result
+
+
+def test_hit_within_ttl():
+    cache = DetailsCache(ttl=30.0)
+    fetch = _Fetch(json.dumps({"id": "123", "name": "campaign"}))
+    assert cache.get_or_fetch("123", fetch) == fetch.result
+    assert cache.get_or_fetch("123", fetch) == fetch.result
+    assert fetch.calls == 1
+
+
+def test_expired_entry_is_refetched(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(meta_api_utils.time, "monotonic", lambda: now[0])
+    cache = DetailsCache(ttl=30.0)
+    fetch = _Fetch({"id": "123"})
+    cache.get_or_fetch("123", fetch)
+    now[0] += 29.0
+    cache.get_or_fetch("123", fetch)
+    assert fetch.calls == 1
+    now[0] += 2.0
+    cache.get_or_fetch("123", fetch)
+    assert fetch.calls == 2
+
+
+def test_errors_are_not_cached():
+    cache = DetailsCache(ttl=30.0)
+    fetch = _Fetch(json.dumps({"error": {"message": "boom"}}))
+    cache.get_or_fetch("123", fetch)
+    cache.get_or_fetch("123", fetch)
+    assert fetch.calls == 2
+
+
+def test_invalidate_and_clear():
+    cache = DetailsCache(ttl=30.0)
+    first = _Fetch({"id": "1"})
+    second = _Fetch({"id": "2"})
+    cache.get_or_fetch("1", first)
+    cache.get_or_fetch("2", second)
+
+    cache.invalidate("1")
+    cache.get_or_fetch("1", first)
+    cache.get_or_fetch("2", second)
+    assert (first.calls, second.calls) == (2, 1)
+
+    cache.clear()
+    cache.get_or_fetch("2", second)
+    assert second.calls == 2
+
+
+def test_read_overlapping_invalidate_is_not_stored():
+    cache = DetailsCache(ttl=30.0)
+    # an update lands while the read is in flight, the read may hold the old values
+    stale = _Fetch({"id": "1", "status": "PAUSED"}, during=lambda: cache.invalidate("1"))
+    assert cache.get_or_fetch("1", stale)["status"] == "PAUSED"
+    fresh = _Fetch({"id": "1", "status": "ACTIVE"})
+    assert cache.get_or_fetch("1", fresh)["status"] == "ACTIVE"
+    assert cache.get_or_fetch("1", fresh)["status"] == "ACTIVE"
+    assert fresh.calls == 1
+
+
+def test_read_overlapping_clear_is_not_stored():
+    cache = DetailsCache(ttl=30.0)
+    stale = _Fetch({"id": "1"}, during=cache.clear)
+    cache.get_or_fetch("1", stale)
+    cache.get_or_fetch("1", stale)
+    assert stale.calls == 2